@@ -6,3 +6,8 @@ class ApiConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        """Подключаем обслуживание соединений, учет запросов и кэш токенов."""
+        from . import authentication, querycount  # noqa: F401
+        from foodgram import dbconnections  # noqa: F401
@@ -0,0 +1,13 @@
+"""URL api под ASGI: чтение рецептов и справочников асинхронное."""
+from django.urls import include, path
+
+from .async_views import async_urlpatterns
+from .urls import router_v1
+
+app_name = 'api'
+
+urlpatterns = [
+    path('', include(async_urlpatterns(router_v1.urls))),
+    path('auth/', include('djoser.urls.authtoken'))
+
+]
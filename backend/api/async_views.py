@@ -0,0 +1,237 @@
+"""Асинхронное чтение рецептов и справочников для ASGI.
+
+Под ASGI GET и HEAD для рецептов, ингредиентов и тегов обслуживают
+асинхронные views, остальные методы — исходные viewset'ы. Запросы к
+базе и другая блокирующая работа выполняются в пуле потоков
+foodgram.threadpool, поэтому медленный запрос занимает поток пула, а
+не весь процесс. Независимые выборки для страницы рецептов идут
+параллельно. Ответы совпадают с ответами синхронных viewset'ов.
+"""
+
+import asyncio
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db.models import BooleanField, F, Value
+from django.http import Http404
+from django.urls import URLPattern
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from .middleware import SAFE_METHODS
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from foodgram.threadpool import run
+from recipes.models import (FavoriteRecipe, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import User
+
+
+async def dispatch(view, request, handler):
+    """APIView.dispatch, в котором блокирующие шаги идут в пул.
+
+    Аутентификация, права и троттлинг выполняются в пуле, обработка
+    исключений и оформление ответа — как в DRF.
+    """
+    args, kwargs = view.args, view.kwargs
+    request = view.initialize_request(request, *args, **kwargs)
+    view.request = request
+    view.headers = view.default_response_headers
+    try:
+        await run(view.initial, request, *args, **kwargs)
+        response = await handler(view, request)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    view.response = view.finalize_response(request, response, *args, **kwargs)
+    if hasattr(view.response, 'render'):
+        # Поля картинок проверяют файлы на диске, браузерный api
+        # строит формы, поэтому рендеринг тоже в пуле.
+        await run(view.response.render)
+    return view.response
+
+
+def async_read(callback, handler):
+    """Асинхронная view вместо view роутера.
+
+    GET и HEAD обрабатывает handler, остальные методы — исходная
+    синхронная view, как ее запустил бы сам Django.
+    """
+    sync_view = sync_to_async(callback)
+    actions = {'head': callback.actions['get'], **callback.actions}
+
+    async def view(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await sync_view(request, *args, **kwargs)
+        self = callback.cls(**callback.initkwargs)
+        self.action_map = actions
+        for method, action in actions.items():
+            setattr(self, method, getattr(self, action))
+        self.request, self.args, self.kwargs = request, args, kwargs
+        return await dispatch(self, request, handler)
+
+    view.cls = callback.cls
+    view.initkwargs = callback.initkwargs
+    view.actions = callback.actions
+    view.csrf_exempt = True
+    return view
+
+
+async def pooled(view, request):
+    """Действие viewset'а целиком в пуле.
+
+    Справочники отвечают из памяти процесса или одним запросом, делить
+    их работу на части незачем.
+    """
+    return await run(
+        getattr(view, view.action), request, *view.args, **view.kwargs)
+
+
+def serialize(view, instance, many=False):
+    """Данные сериализатора viewset'а."""
+    return view.get_serializer(instance, many=many).data
+
+
+def attach(instance, name, objects):
+    """Кладем связанные объекты в кэш предзагрузки.
+
+    Так же prefetch_related_objects заполняет кэш после своего запроса,
+    и сериализатор получает их через instance.<name>.all() без запросов.
+    """
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+    instance.__dict__.setdefault('_prefetched_objects_cache', {})[
+        name] = queryset
+
+
+def authors_by_id(recipe_ids, user):
+    """Авторы рецептов с отметкой подписки пользователя."""
+    return User.objects.with_subscription(user).filter(
+        pk__in=Recipe.objects.filter(
+            pk__in=recipe_ids).values('author_id')).in_bulk()
+
+
+def tags_by_recipe(recipe_ids):
+    """Теги рецептов в порядке справочника."""
+    tags = defaultdict(list)
+    for tag in Tag.objects.filter(recipes__in=recipe_ids).annotate(
+            recipe_id=F('recipes')):
+        tags[tag.recipe_id].append(tag)
+    return tags
+
+
+def amounts_by_recipe(recipe_ids):
+    """Ингредиенты рецептов с количеством."""
+    amounts = defaultdict(list)
+    for amount in IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids).select_related('ingredient'):
+        amounts[amount.recipe_id].append(amount)
+    return amounts
+
+
+def viewer_flags(recipe_ids, user):
+    """Рецепты из recipe_ids в избранном и в списке покупок user.
+
+    Обе выборки объединены в один запрос через UNION ALL.
+    """
+    if not user.is_authenticated:
+        return frozenset(), frozenset()
+    favorited = FavoriteRecipe.objects.filter(
+        user=user, recipe_id__in=recipe_ids,
+    ).annotate(in_cart=Value(False, output_field=BooleanField()))
+    in_cart = ShoppingCart.objects.filter(
+        user=user, recipe_id__in=recipe_ids,
+    ).annotate(in_cart=Value(True, output_field=BooleanField()))
+    flags = {False: set(), True: set()}
+    for recipe_id, cart in favorited.values_list(
+            'recipe_id', 'in_cart').union(
+            in_cart.values_list('recipe_id', 'in_cart'), all=True):
+        flags[bool(cart)].add(recipe_id)
+    return flags[False], flags[True]
+
+
+async def load_recipes(view, recipe_ids):
+    """Рецепты с авторами, тегами, ингредиентами и отметками юзера.
+
+    Все выборки зависят только от id рецептов и пользователя, поэтому
+    выполняются параллельно, а связи собираются в памяти. Рецепты
+    возвращаются в порядке recipe_ids, исчезнувшие пропускаются.
+    """
+    user = view.request.user
+    recipes, authors, tags, amounts, (favorited, in_cart) = (
+        await asyncio.gather(
+            run(Recipe.objects.in_bulk, recipe_ids),
+            run(authors_by_id, recipe_ids, user),
+            run(tags_by_recipe, recipe_ids),
+            run(amounts_by_recipe, recipe_ids),
+            run(viewer_flags, recipe_ids, user),
+        ))
+    result = []
+    for recipe_id in recipe_ids:
+        recipe = recipes.get(recipe_id)
+        if recipe is None or recipe.author_id not in authors:
+            continue
+        recipe.author = authors[recipe.author_id]
+        recipe.is_favorited = recipe_id in favorited
+        recipe.is_in_shopping_cart = recipe_id in in_cart
+        attach(recipe, 'tags', tags[recipe_id])
+        attach(recipe, 'ingredients_amout', amounts[recipe_id])
+        result.append(recipe)
+    return result
+
+
+async def recipe_list(view, request):
+    """Список рецептов: валидатор со страницей, затем данные страницы."""
+    rows, page = await run(view.get_list_etag_rows)
+    etag = view.make_etag(rows)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        recipes = await load_recipes(view, [row['id'] for row in page])
+        data = await run(serialize, view, recipes, many=True)
+        response = (
+            Response(data) if view.paginator is None
+            else view.get_paginated_response(data))
+    return view.tag_response(response, etag)
+
+
+async def recipe_detail(view, request):
+    """Карточка рецепта."""
+    rows = await run(view.get_object_etag_rows)
+    if not rows:
+        raise Http404
+    etag = view.make_etag(rows)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        recipes = await load_recipes(
+            view, [rows[0][view.etag_fields.index('id')]])
+        if not recipes:
+            raise Http404
+        view.check_object_permissions(request, recipes[0])
+        response = Response(await run(serialize, view, recipes[0]))
+    return view.tag_response(response, etag)
+
+
+ASYNC_ACTIONS = {
+    (RecipeViewSet, 'list'): recipe_list,
+    (RecipeViewSet, 'retrieve'): recipe_detail,
+    (IngredientViewSet, 'list'): pooled,
+    (IngredientViewSet, 'retrieve'): pooled,
+    (TagViewSet, 'list'): pooled,
+    (TagViewSet, 'retrieve'): pooled,
+}
+
+
+def async_urlpatterns(patterns):
+    """Пути роутера, в которых views чтения заменены асинхронными."""
+    result = []
+    for pattern in patterns:
+        callback = pattern.callback
+        handler = ASYNC_ACTIONS.get((
+            getattr(callback, 'cls', None),
+            getattr(callback, 'actions', {}).get('get'),
+        ))
+        if handler is not None:
+            pattern = URLPattern(
+                pattern.pattern, async_read(callback, handler),
+                pattern.default_args, pattern.name)
+        result.append(pattern)
+    return result
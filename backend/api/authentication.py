@@ -0,0 +1,185 @@
+"""Аутентификация по токену с кэшем пользователей.
+
+TokenAuthentication на каждый запрос читает токен вместе с пользователем
+из базы. Здесь успешные проверки запоминаются в ограниченном LRU-кэше
+процесса на AUTH_CACHE_TTL секунд, а при AUTH_CACHE_SHARED еще и в общем
+кэше, чтобы новый воркер не ходил за ними в базу. В кэш попадают только
+поля USER_FIELDS, без хеша пароля.
+
+У каждого токена из базы есть поколение в общем кэше, как версия у
+справочников в recipes.catalog. Запись кэша помнит поколение и
+годится, только пока оно не изменилось. Удаление токена (выход через
+djoser) и любое сохранение пользователя (смена пароля, деактивация,
+правка профиля) меняют поколение его токенов, поэтому
+записи устаревают сразу во всех процессах.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram.routers import PRIMARY
+from users.models import User
+
+# Поля пользователя, которые нужны request.user в api, в порядке полей
+# модели, как их ждет from_db. Остальные, включая пароль, загружаются
+# из базы при первом обращении.
+USER_FIELDS = tuple(
+    field for field in User._meta.concrete_fields if field.attname in {
+        'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
+        'is_active', 'is_staff', 'is_superuser',
+    })
+
+
+class TokenCache:
+    """LRU-кэш записей токенов с временем жизни."""
+
+    def __init__(self, size, ttl):
+        """Пустой кэш на size записей."""
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Запись по ключу токена или None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        """Запоминаем запись."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys):
+        """Удаляем записи токенов keys."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+token_cache = TokenCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+
+
+def shared_key(key, kind='entry'):
+    """Ключ общего кэша: сам токен в имени ключа не светится."""
+    return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}:{kind}'
+
+
+def create_generation(key):
+    """Первое поколение проверенного токена или None, если опередили.
+
+    Поколение создается только для токена, найденного в базе, иначе
+    каждый случайный ключ оставлял бы в общем кэше вечную запись. Если
+    поколение уже успел задать другой запрос или выход, прочитанные
+    данные могли устареть, и запись кэша не создается.
+    """
+    generation = uuid4().hex
+    if cache.add(shared_key(key, 'generation'), generation, None):
+        return generation
+    return None
+
+
+def user_values(user):
+    """Значения USER_FIELDS в том виде, в каком они лежат в базе."""
+    return tuple(
+        field.get_prep_value(field.value_from_object(user))
+        for field in USER_FIELDS)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который помнит проверенные токены.
+
+    Запись кэша — (поколение, значения USER_FIELDS, дата создания
+    токена). Каждый запрос получает своих пользователя и токен,
+    собранные из записи, поэтому изменения request.user в одном запросе
+    не попадают в другие.
+    """
+
+    def authenticate_credentials(self, key):
+        """Пользователь и токен из кэша, при промахе — из базы."""
+        generation = cache.get(shared_key(key, 'generation'))
+        if generation is not None:
+            entry = token_cache.get(key)
+            if entry is None and settings.AUTH_CACHE_SHARED:
+                entry = cache.get(shared_key(key))
+            if entry is not None and entry[0] == generation:
+                token_cache.set(key, entry)
+                return self.restore(key, entry)
+        user, token = super().authenticate_credentials(key)
+        if generation is None:
+            generation = create_generation(key)
+            if generation is None:
+                return user, token
+        entry = (generation, user_values(user), token.created)
+        token_cache.set(key, entry)
+        if settings.AUTH_CACHE_SHARED:
+            cache.set(shared_key(key), entry, settings.AUTH_CACHE_TTL)
+        return user, token
+
+    @staticmethod
+    def restore(key, entry):
+        """Пользователь и токен из записи кэша."""
+        _, values, created = entry
+        user = User.from_db(
+            PRIMARY, [field.attname for field in USER_FIELDS], values)
+        token = Token.from_db(
+            PRIMARY, ('key', 'user_id', 'created'), (key, user.pk, created))
+        token.user = user
+        return user, token
+
+
+def forget(keys):
+    """Новое поколение токенов keys и удаление их записей."""
+    token_cache.discard(keys)
+    if keys:
+        cache.set_many(
+            {shared_key(key, 'generation'): uuid4().hex for key in keys},
+            None)
+        cache.delete_many([shared_key(key) for key in keys])
+
+
+def invalidate(keys):
+    """Меняем поколение сейчас и еще раз после фиксации транзакции.
+
+    Повтор нужен, если до фиксации другой запрос успел прочитать из
+    базы старые данные с уже новым поколением.
+    """
+    keys = list(keys)
+    forget(keys)
+    transaction.on_commit(lambda: forget(keys))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Выход и удаление токена."""
+    invalidate([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """Смена пароля, деактивация и правка профиля."""
+    if created:
+        return
+    invalidate(Token.objects.filter(
+        user_id=instance.pk).values_list('key', flat=True))
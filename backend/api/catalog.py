@@ -0,0 +1,89 @@
+"""Кэш готовых ответов для справочников ингредиентов и тегов."""
+
+import gzip
+import hashlib
+from collections import namedtuple
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from .fastpath import serialize_rows
+from .renderers import FastJSONRenderer
+from foodgram.routers import PRIMARY
+from recipes.catalog import get_version
+
+CatalogEntry = namedtuple(
+    'CatalogEntry', ('version', 'body', 'gzipped', 'etag', 'gzip_etag'))
+
+
+def parse_etags(header):
+    """Список ETag из заголовка If-None-Match без префикса W/."""
+    return [
+        tag.strip().removeprefix('W/') for tag in header.split(',')
+        if tag.strip()
+    ]
+
+
+class CatalogCache:
+    """Сериализованный и сжатый ответ для каждой версии справочника.
+
+    Ответ строится один раз на версию в каждом процессе. Клиенты
+    получают сильный ETag и могут перепроверять данные через 304.
+    """
+
+    def __init__(self):
+        """Пустой кэш."""
+        self._entries = {}
+
+    def entry(self, name, queryset, serializer_class):
+        """Готовый ответ для текущей версии справочника."""
+        version = get_version(name)
+        entry = self._entries.get(name)
+        if entry is None or entry.version != version:
+            body = FastJSONRenderer().render(
+                serialize_rows(serializer_class, queryset))
+            digest = hashlib.sha256(body).hexdigest()[:32]
+            entry = CatalogEntry(
+                version, body, gzip.compress(body, mtime=0),
+                f'"{digest}"', f'"{digest}-gzip"')
+            self._entries[name] = entry
+        return entry
+
+    def response(self, request, name, queryset, serializer_class):
+        """Ответ 200 или 304 для справочника."""
+        entry = self.entry(name, queryset, serializer_class)
+        use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        etag = entry.gzip_etag if use_gzip else entry.etag
+        client_etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if '*' in client_etags or {entry.etag, entry.gzip_etag} & set(
+                client_etags):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                entry.gzipped if use_gzip else entry.body,
+                content_type='application/json')
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+catalog_cache = CatalogCache()
+
+
+class CatalogCacheMixin:
+    """Список справочника из кэша для JSON-клиентов."""
+
+    catalog_name = None
+
+    def list(self, request, *args, **kwargs):
+        """Список целиком из кэша, если запрошен JSON."""
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return catalog_cache.response(
+            request, self.catalog_name,
+            # Кэш живет до смены версии, поэтому читаем из основной базы.
+            self.filter_queryset(self.get_queryset()).using(PRIMARY),
+            self.get_serializer_class())
@@ -0,0 +1,114 @@
+"""Условные GET-запросы (ETag) для списков и отдельных объектов."""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """ETag для list и retrieve.
+
+    Валидатор считается по легкому запросу values_list из etag_fields,
+    поэтому на совпадающий If-None-Match отвечаем 304 без загрузки
+    связанных объектов и без сериализации. Список при этом
+    пагинируется один раз: объекты страницы загружаются по id из
+    расчета валидатора. Ответ зависит от того, кто его запрашивает,
+    поэтому ETag учитывает пользователя, а в ответ добавляется
+    Vary: Authorization.
+    """
+
+    etag_fields = ()
+
+    def get_etag_queryset(self):
+        """Queryset для расчета валидатора."""
+        return self.filter_queryset(
+            self.get_queryset()).prefetch_related(None)
+
+    def get_etag_extra(self):
+        """Дополнительные данные, от которых зависит ответ."""
+        return ()
+
+    def make_etag(self, rows):
+        """ETag по строкам валидатора."""
+        state = (
+            self.request.get_full_path(),
+            self.request.user.pk,
+            self.get_etag_extra(),
+            rows,
+        )
+        return f'"{hashlib.sha1(repr(state).encode()).hexdigest()}"'
+
+    def conditional(self, request, rows, handler, *args, **kwargs):
+        """304, если у клиента актуальная версия, иначе обычный ответ."""
+        etag = self.make_etag(rows)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self.tag_response(response, etag)
+
+    def tag_response(self, response, etag):
+        """ETag и Vary для успешного ответа."""
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def get_list_etag_rows(self):
+        """Строки валидатора списка и строки текущей страницы.
+
+        Страница — это словари values() с полями etag_fields, пагинатор
+        после вызова знает ее положение, как после paginate_queryset.
+        """
+        queryset = self.get_etag_queryset()
+        fields = list(self.etag_fields)
+        if self.paginator is not None:
+            # Пагинации по курсору нужны значения полей сортировки.
+            fields += [
+                field.lstrip('-') for field in
+                self.paginator.get_ordering(queryset)]
+        queryset = queryset.values(*dict.fromkeys(fields))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows = list(queryset)
+            return rows, rows
+        return [*page, self.paginator.get_etag_state()], page
+
+    def get_object_etag_rows(self):
+        """Строки валидатора объекта, пустые, если его нет."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return list(self.get_etag_queryset().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        ).values_list(*self.etag_fields))
+
+    def get_page_objects(self, page):
+        """Объекты страницы валидатора в ее порядке.
+
+        Объекты, удаленные между двумя запросами, пропускаются.
+        """
+        ids = [row['id'] for row in page]
+        objects = {
+            obj.pk: obj
+            for obj in self.get_queryset().filter(pk__in=ids).order_by()}
+        return [objects[pk] for pk in ids if pk in objects]
+
+    def list_page(self, request, page):
+        """Ответ списка по странице из расчета валидатора."""
+        serializer = self.get_serializer(
+            self.get_page_objects(page), many=True)
+        if self.paginator is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        """Список с проверкой ETag."""
+        rows, page = self.get_list_etag_rows()
+        return self.conditional(request, rows, self.list_page, page)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Объект с проверкой ETag."""
+        rows = self.get_object_etag_rows()
+        if not rows:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional(
+            request, rows, super().retrieve, *args, **kwargs)
@@ -0,0 +1,197 @@
+"""Быстрая сериализация ответов на чтение.
+
+DRF для каждого объекта проходит по полям сериализатора через
+get_attribute со всеми проверками и собирает OrderedDict, а вложенные
+сериализаторы повторяют это для автора, тегов и ингредиентов. Здесь
+для сериализатора один раз на ответ строится план: у каждого поля
+готовая функция значения. Простые поля модели читаются attrgetter'ом
+с тем же приведением типа, что у поля DRF, вложенные сериализаторы
+разворачиваются в свои планы, а для остальных полей вызываются
+get_attribute и to_representation самого поля. Поэтому результат
+совпадает с serializer.data.
+"""
+
+from functools import cached_property, partial
+from operator import attrgetter
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+
+def identity(value):
+    """Значение без изменений, как у ReadOnlyField."""
+    return value
+
+
+# Поля, у которых to_representation только приводит тип значения.
+CONVERTERS = {
+    serializers.IntegerField: int,
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.SlugField: str,
+    serializers.ReadOnlyField: identity,
+}
+
+
+def is_plain(serializer):
+    """Сериализатор без своего to_representation."""
+    if isinstance(serializer, serializers.ListSerializer):
+        return (
+            type(serializer).to_representation
+            is serializers.ListSerializer.to_representation
+            and isinstance(serializer.child, serializers.Serializer)
+            and is_plain(serializer.child))
+    return (
+        isinstance(serializer, serializers.Serializer)
+        and type(serializer).to_representation
+        is serializers.Serializer.to_representation)
+
+
+def field_value(field, instance):
+    """Значение поля так, как его считает Serializer.to_representation."""
+    attribute = field.get_attribute(instance)
+    check_for_none = (
+        attribute.pk if isinstance(attribute, PKOnlyObject) else attribute)
+    if check_for_none is None:
+        return None
+    return field.to_representation(attribute)
+
+
+def compile_many(serializer):
+    """Функция представления списка объектов или менеджера."""
+    represent = compile_plan(serializer.child)
+
+    def convert(value):
+        if isinstance(value, models.Manager):
+            value = value.all()
+        return [represent(item) for item in value]
+    return convert
+
+
+def compile_field(field):
+    """Функция значения поля для объекта."""
+    if field.source == '*':
+        if type(field) is serializers.SerializerMethodField:
+            return getattr(field.parent, field.method_name)
+        return partial(field_value, field)
+    if isinstance(field, serializers.BaseSerializer) and is_plain(field):
+        convert = (
+            compile_many(field) if isinstance(
+                field, serializers.ListSerializer)
+            else compile_plan(field))
+    elif type(field) in CONVERTERS:
+        convert = CONVERTERS[type(field)]
+    else:
+        return partial(field_value, field)
+    getter = attrgetter('.'.join(field.source_attrs))
+    many = isinstance(field, serializers.ListSerializer)
+
+    def value(instance):
+        try:
+            attribute = getter(instance)
+        except (AttributeError, KeyError, ObjectDoesNotExist):
+            # Значения по умолчанию, allow_null и пропуск поля.
+            return field_value(field, instance)
+        if attribute is None:
+            return None
+        if callable(attribute) and not many:
+            # Источник — метод, DRF его вызывает.
+            return field_value(field, instance)
+        return convert(attribute)
+    return value
+
+
+def compile_plan(serializer):
+    """План сериализатора: функция объект -> словарь полей."""
+    steps = [
+        (field.field_name, compile_field(field))
+        for field in serializer._readable_fields
+    ]
+
+    def represent(instance):
+        data = {}
+        for name, value in steps:
+            try:
+                data[name] = value(instance)
+            except SkipField:
+                pass
+        return data
+    return represent
+
+
+def serialize(serializer):
+    """То же, что serializer.data, для сериализатора на чтение."""
+    if serializer.instance is None or not is_plain(serializer):
+        return serializer.data
+    if isinstance(serializer, serializers.ListSerializer):
+        return compile_many(serializer)(serializer.instance)
+    return compile_plan(serializer)(serializer.instance)
+
+
+def serialize_rows(serializer_class, queryset):
+    """Список по строкам values() без создания объектов модели.
+
+    Подходит для сериализаторов из одних простых полей, остальные
+    сериализуются обычным способом.
+    """
+    fields = list(serializer_class()._readable_fields)
+    if not all(
+            type(field) in CONVERTERS and field.source != '*'
+            for field in fields):
+        return serializer_class(queryset, many=True).data
+    plan = [
+        (field.field_name, '__'.join(field.source_attrs),
+         CONVERTERS[type(field)])
+        for field in fields
+    ]
+    return [
+        {
+            name: None if row[key] is None else convert(row[key])
+            for name, key, convert in plan
+        }
+        for row in queryset.values(*(key for _, key, _ in plan))
+    ]
+
+
+class FastSerializer:
+    """Сериализатор, у которого .data строится по плану."""
+
+    def __init__(self, serializer):
+        """Исходный сериализатор."""
+        self.serializer = serializer
+
+    @cached_property
+    def data(self):
+        """Данные ответа."""
+        return serialize(self.serializer)
+
+    def __getattr__(self, name):
+        """Остальное — от исходного сериализатора."""
+        return getattr(self.serializer, name)
+
+
+class FastReadMixin:
+    """list и retrieve отвечают в JSON по плану сериализатора."""
+
+    fast_read_actions = ('list', 'retrieve')
+
+    def get_serializer(self, *args, **kwargs):
+        """Сериализатор с быстрым .data для чтения."""
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.action in self.fast_read_actions:
+            return self.fast(serializer)
+        return serializer
+
+    def fast(self, serializer):
+        """Быстрый .data, если ответ пойдет в JSON.
+
+        Браузерному api нужен настоящий сериализатор для форм.
+        """
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if (serializer.instance is None or renderer is None
+                or renderer.format != 'json'):
+            return serializer
+        return FastSerializer(serializer)
@@ -1,19 +1,83 @@
 """Кастомные поля."""
 import base64
+import binascii
 
+from django.conf import settings
 from django.core.files.base import ContentFile
 from rest_framework import serializers
 
+from recipes.images import variant_urls
+
+ALLOWED_IMAGE_FORMATS = ('jpeg', 'jpg', 'png', 'gif', 'webp')
+
 
 class Base64ImageField(serializers.ImageField):
     """Сериализатор для работы с медиа."""
 
     def to_internal_value(self, data):
-        """обработка полученных данных."""
+        """обработка полученных данных.
+
+        Формат и размер проверяются до декодирования, чтобы не
+        раскодировать в памяти заведомо неподходящие данные.
+        """
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+            try:
+                format, imgstr = data.split(';base64,')
+            except ValueError:
+                self.fail('invalid_image')
+            ext = format.split('/')[-1].lower()
+            if ext not in ALLOWED_IMAGE_FORMATS:
+                raise serializers.ValidationError(
+                    'Поддерживаются форматы: '
+                    f'{", ".join(ALLOWED_IMAGE_FORMATS)}.')
+            if len(imgstr) * 3 // 4 > settings.MAX_UPLOAD_IMAGE_SIZE:
+                raise serializers.ValidationError(
+                    'Размер изображения не должен превышать '
+                    f'{settings.MAX_UPLOAD_IMAGE_SIZE // (1024 * 1024)} МБ.')
+            try:
+                content = base64.b64decode(imgstr, validate=True)
+            except binascii.Error:
+                self.fail('invalid_image')
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = ContentFile(content, name='temp.' + ext)
 
         return super().to_internal_value(data)
+
+
+class DeferredPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """Первичный ключ без запроса к базе.
+
+    Проверяется только тип значения, существование объектов проверяет
+    родительский сериализатор сразу для всех ключей.
+    """
+
+    def to_internal_value(self, data):
+        """Приводим ключ к числу."""
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ImageVariantsField(serializers.Field):
+    """Адреса уменьшенных копий изображения."""
+
+    def __init__(self, **kwargs):
+        """Поле только для чтения."""
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, image):
+        """Словарь адресов копий по размерам."""
+        if not image:
+            return None
+        request = self.context.get('request')
+        urls = variant_urls(image)
+        if request is None:
+            return urls
+        return {
+            variant: request.build_absolute_uri(url)
+            for variant, url in urls.items()
+        }
@@ -1,8 +1,21 @@
 """Работа с фильтрами проекта."""
 
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from foodgram.routers import PRIMARY
+from recipes.catalog import TAGS, CatalogMap
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart, Tag
+
+TAGS_MATCH_CHOICES = (('any', 'Любой из тегов'), ('all', 'Все теги'))
+
+tag_ids_by_slug = CatalogMap(
+    TAGS, lambda: dict(Tag.objects.using(PRIMARY).values_list('slug', 'id')))
+
+
+def tag_choices():
+    """Допустимые slug тегов из справочника в памяти."""
+    return [(slug, slug) for slug in tag_ids_by_slug.get()]
 
 
 class RecipeFilter(filters.FilterSet):
@@ -11,36 +24,58 @@ class RecipeFilter(filters.FilterSet):
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(), field_name='tags__slug',
-        to_field_name='slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags')
+    tags_match = filters.ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES, method='filter_tags_match')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         """Свойства."""
 
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'tags_match', 'is_favorited',
+                  'is_in_shopping_cart', 'search')
+
+    def filter_tags(self, queryset, name, value):
+        """Фильтр по тегам через EXISTS, без соединения и повторов строк.
+
+        По умолчанию рецепт подходит, если у него есть любой из тегов,
+        при tags_match=all — если есть все.
+        """
+        if not value:
+            return queryset
+        ids = tag_ids_by_slug.get()
+        tag_ids = [ids[slug] for slug in value if slug in ids]
+        TagThrough = Recipe.tags.through
+        if self.form.cleaned_data.get('tags_match') == 'all':
+            for tag_id in tag_ids:
+                queryset = queryset.filter(Exists(TagThrough.objects.filter(
+                    recipe=OuterRef('pk'), tag_id=tag_id)))
+            return queryset
+        return queryset.filter(Exists(TagThrough.objects.filter(
+            recipe=OuterRef('pk'), tag_id__in=tag_ids)))
+
+    def filter_tags_match(self, queryset, name, value):
+        """Режим учитывается в filter_tags."""
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию."""
+        return queryset.search(value)
 
     def filter_is_favorited(self, queryset, name, value):
         """Фильтрует по тому, находится ли рецепт в избранном."""
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(favoriterecipe__user=user)
+            return queryset.filter(Exists(FavoriteRecipe.objects.filter(
+                recipe=OuterRef('pk'), user=user)))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         """Фильтрует по тому, находится ли рецепт в корзине покупок."""
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(shoppingcart__user=user)
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                recipe=OuterRef('pk'), user=user)))
         return queryset
-
-
-class IngredientFilter(filters.FilterSet):
-    """Поиск по названию без учета регистра."""
-
-    name = filters.CharFilter(field_name='name', lookup_expr='icontains')
-
-    class Meta:
-        model = Ingredient
-        fields = ['name']
@@ -0,0 +1,189 @@
+"""Замер задержек и числа запросов для всех эндпоинтов роутера api."""
+
+import json
+import platform
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.querycount import QueryRecorder
+from api.urls import router_v1
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+from users.models import SubscrUser, User
+
+# Доля пользователей от числа рецептов при генерации данных.
+USERS_PER_RECIPE = 0.1
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированной выборке."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """Бенчмарк GET-эндпоинтов api на нескольких объемах данных."""
+
+    help = ('Измеряет задержку и число SQL-запросов для всех GET-эндпоинтов '
+            'роутера api и сохраняет отчет в JSON.')
+
+    def add_arguments(self, parser):
+        """Параметры команды."""
+        parser.add_argument(
+            '--scales', default='',
+            help='Число рецептов через запятую, например 1000,10000. '
+                 'Перед каждым замером база дополняется через seed_data. '
+                 'Без параметра замеряется текущая база.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare', default=None,
+                            help='Предыдущий отчет для сравнения.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        """Запуск замеров."""
+        scales = [
+            int(scale) for scale in options['scales'].split(',') if scale]
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'repeat': options['repeat'],
+            'runs': [],
+        }
+        for scale in scales or [None]:
+            if scale is not None:
+                self.grow_to(scale, options['seed'])
+            report['runs'].append(self.run(options))
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчет сохранен в {options["output"]}.'))
+        if options['compare']:
+            self.compare(options['compare'], report)
+
+    def grow_to(self, scale, seed):
+        """Дополняем базу до scale рецептов."""
+        missing = scale - Recipe.objects.count()
+        if missing > 0:
+            call_command(
+                'seed_data', recipes=missing,
+                users=max(1, int(missing * USERS_PER_RECIPE)),
+                seed=seed + scale, stdout=self.stdout)
+
+    def counts(self):
+        """Объем данных на момент замера."""
+        return {
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'ingredients': Ingredient.objects.count(),
+            'subscriptions': SubscrUser.objects.count(),
+        }
+
+    def viewer(self):
+        """Пользователь с подписками и корзиной, от имени которого замер."""
+        user = (
+            User.objects.filter(subscribers__isnull=False,
+                                shoppingcart__isnull=False)
+            .order_by('id').first()
+            or User.objects.order_by('id').first()
+        )
+        if user is None:
+            raise CommandError(
+                'База пуста: укажите --scales или запустите seed_data.')
+        return user
+
+    def sample_ids(self, user):
+        """Идентификаторы для detail-эндпоинтов."""
+        subscription = SubscrUser.objects.filter(subscriber=user).first()
+        cart = ShoppingCart.objects.filter(user=user).first()
+        return {
+            'users': subscription.author_id if subscription else user.id,
+            'recipes': (
+                cart.recipe_id if cart
+                else Recipe.objects.values_list('id', flat=True).first()),
+            'ingredients': Ingredient.objects.values_list(
+                'id', flat=True).first(),
+            'tags': Tag.objects.values_list('id', flat=True).first(),
+        }
+
+    def endpoints(self, sample_ids):
+        """GET-эндпоинты всех зарегистрированных в роутере viewset'ов."""
+        for prefix, viewset, _ in router_v1.registry:
+            pk = sample_ids.get(prefix)
+            yield f'{prefix}-list', f'/api/{prefix}/'
+            if pk is not None and hasattr(viewset, 'retrieve'):
+                yield f'{prefix}-detail', f'/api/{prefix}/{pk}/'
+            for extra in viewset.get_extra_actions():
+                if 'get' not in extra.mapping or '(?P' in extra.url_path:
+                    continue
+                if extra.detail:
+                    if pk is None:
+                        continue
+                    path = f'/api/{prefix}/{pk}/{extra.url_path}/'
+                else:
+                    path = f'/api/{prefix}/{extra.url_path}/'
+                yield f'{prefix}-{extra.url_name}', path
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def run(self, options):
+        """Замер всех эндпоинтов на текущем объеме данных."""
+        user = self.viewer()
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        results = {}
+        for name, path in self.endpoints(self.sample_ids(user)):
+            for _ in range(options['warmup']):
+                client.get(path)
+            timings = []
+            for _ in range(options['repeat']):
+                with QueryRecorder() as recorder:
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                'path': path,
+                'status': response.status_code,
+                'queries': recorder.count,
+                'duplicate_queries': sum(recorder.duplicates.values()),
+                'db_ms': recorder.duration_ms,
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'mean_ms': round(statistics.mean(timings), 2),
+            }
+            self.stdout.write(
+                f'{name:40} {response.status_code} '
+                f'q={recorder.count:<4} '
+                f'p50={results[name]["p50_ms"]:>8} мс '
+                f'p95={results[name]["p95_ms"]:>8} мс')
+        return {'counts': self.counts(), 'endpoints': results}
+
+    def compare(self, path, report):
+        """Сравнение с предыдущим отчетом по совпадающим объемам данных."""
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)
+        old_runs = {
+            run['counts']['recipes']: run for run in previous['runs']}
+        for new_run in report['runs']:
+            old_run = old_runs.get(new_run['counts']['recipes'])
+            if old_run is None:
+                continue
+            self.stdout.write(f'Рецептов: {new_run["counts"]["recipes"]}')
+            for name, new in new_run['endpoints'].items():
+                old = old_run['endpoints'].get(name)
+                if old is None:
+                    continue
+                self.stdout.write(
+                    f'  {name:38} '
+                    f'p50 {old["p50_ms"]} -> {new["p50_ms"]} мс, '
+                    f'запросов {old["queries"]} -> {new["queries"]}')
@@ -0,0 +1,168 @@
+"""Сравнение пропускной способности чтения под WSGI и под ASGI."""
+
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from .benchmark_api import percentile
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Нагрузка одновременными клиентами в двух режимах сервера.
+
+    Под WSGI запросы обслуживает фиксированное число синхронных
+    воркеров, как у gunicorn, и клиент ждет свободного воркера. Под ASGI
+    один процесс обслуживает всех клиентов асинхронными views, а запросы
+    к базе идут в пул из ASYNC_DB_WORKERS потоков. Медленную базу
+    имитирует задержка перед каждым SQL-запросом.
+    """
+
+    help = ('Сравнивает задержку и пропускную способность GET-эндпоинтов '
+            'рецептов и справочников под WSGI и под ASGI.')
+
+    def add_arguments(self, parser):
+        """Параметры команды."""
+        parser.add_argument('--clients', type=int, default=32,
+                            help='Одновременных клиентов.')
+        parser.add_argument('--requests', type=int, default=20,
+                            help='Запросов от каждого клиента.')
+        parser.add_argument('--wsgi-workers', type=int, default=4,
+                            help='Синхронных воркеров в режиме WSGI.')
+        parser.add_argument('--db-delay', type=float, default=20,
+                            help='Задержка каждого SQL-запроса, мс.')
+        parser.add_argument('--output', default=None,
+                            help='Файл для отчета в JSON.')
+
+    def handle(self, *args, **options):
+        """Запуск замеров в обоих режимах."""
+        user = User.objects.order_by('id').first()
+        recipe_id = Recipe.objects.values_list('id', flat=True).first()
+        if user is None or recipe_id is None:
+            raise CommandError('База пуста: запустите seed_data.')
+        token, _ = Token.objects.get_or_create(user=user)
+        ingredient = Ingredient.objects.values_list('name', flat=True).first()
+        self.auth = f'Token {token.key}'
+        self.paths = [
+            '/api/recipes/',
+            f'/api/recipes/{recipe_id}/',
+            f'/api/ingredients/?name={(ingredient or "")[:3]}',
+            '/api/tags/',
+            f'/api/tags/{Tag.objects.values_list("id", flat=True).first()}/',
+        ]
+        self.delay = options['db_delay'] / 1000
+        connection_created.connect(self.slow_down)
+        for connection in connections.all():
+            if connection.connection is not None:
+                self.slow_down(None, connection)
+        with override_settings(ALLOWED_HOSTS=['*']):
+            report = {
+                'clients': options['clients'],
+                'requests_per_client': options['requests'],
+                'db_delay_ms': options['db_delay'],
+                'wsgi': self.run_wsgi(options),
+                'asgi': self.run_asgi(options),
+            }
+        connection_created.disconnect(self.slow_down)
+        for mode in ('wsgi', 'asgi'):
+            result = report[mode]
+            self.stdout.write(
+                f'{mode.upper():5} {result["workers"]:>3} потоков: '
+                f'{result["rps"]:>8} запросов/с, '
+                f'p50={result["p50_ms"]} мс, p95={result["p95_ms"]} мс, '
+                f'ошибок: {result["errors"]}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчет сохранен в {options["output"]}.'))
+
+    def slow_down(self, sender, connection, **kwargs):
+        """Задержка перед каждым запросом к базе."""
+        def delayed(execute, sql, params, many, context):
+            time.sleep(self.delay)
+            return execute(sql, params, many, context)
+
+        if self.delay > 0:
+            connection.execute_wrappers.append(delayed)
+
+    @staticmethod
+    def summary(timings, errors, elapsed, workers):
+        """Итоги замера."""
+        return {
+            'workers': workers,
+            'requests': len(timings),
+            'errors': errors,
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+        }
+
+    def run_wsgi(self, options):
+        """Клиенты в потоках, синхронные воркеры в отдельном пуле."""
+        local = threading.local()
+        timings = []
+        errors = []
+
+        def get(path):
+            if not hasattr(local, 'client'):
+                local.client = Client(HTTP_AUTHORIZATION=self.auth)
+            return local.client.get(path).status_code
+
+        def client_loop(workers, number):
+            for index in range(options['requests']):
+                path = self.paths[(number + index) % len(self.paths)]
+                started = time.perf_counter()
+                status = workers.submit(get, path).result()
+                timings.append((time.perf_counter() - started) * 1000)
+                errors.append(status != 200)
+
+        with ThreadPoolExecutor(options['wsgi_workers']) as workers:
+            with ThreadPoolExecutor(options['clients']) as clients:
+                started = time.perf_counter()
+                for future in [
+                        clients.submit(client_loop, workers, number)
+                        for number in range(options['clients'])]:
+                    future.result()
+                elapsed = time.perf_counter() - started
+        return self.summary(
+            timings, sum(errors), elapsed, options['wsgi_workers'])
+
+    def run_asgi(self, options):
+        """Все клиенты в одном цикле событий с асинхронными views."""
+        timings = []
+        errors = []
+
+        async def client_loop(number):
+            client = AsyncClient()
+            for index in range(options['requests']):
+                path = self.paths[(number + index) % len(self.paths)]
+                started = time.perf_counter()
+                # AsyncClient передает именованные аргументы заголовками.
+                response = await client.get(path, AUTHORIZATION=self.auth)
+                timings.append((time.perf_counter() - started) * 1000)
+                errors.append(response.status_code != 200)
+
+        async def main():
+            await asyncio.gather(*(
+                client_loop(number) for number in range(options['clients'])))
+
+        with override_settings(ROOT_URLCONF='foodgram.async_urls'):
+            started = time.perf_counter()
+            asyncio.run(main())
+            elapsed = time.perf_counter() - started
+        return self.summary(
+            timings, sum(errors), elapsed, settings.ASYNC_DB_WORKERS)
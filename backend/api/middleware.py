@@ -0,0 +1,186 @@
+"""Промежуточные слои для api."""
+
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .querycount import QueryRecorder
+from foodgram import routers
+from foodgram.threadpool import run
+
+logger = logging.getLogger('foodgram.queries')
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class HybridMiddleware(ABC):
+    """Слой, который работает и под WSGI, и под ASGI.
+
+    Под ASGI цепочка слоев остается асинхронной: синхронный слой
+    заставил бы Django выполнять весь запрос в единственном потоке для
+    синхронного кода, и асинхронные views потеряли бы смысл. Наследники
+    реализуют обработку для обоих режимов.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Сохраняем следующий обработчик."""
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так же себя помечает MiddlewareMixin в Django.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        """Синхронный или асинхронный вызов в зависимости от цепочки."""
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    @abstractmethod
+    def handle(self, request):
+        """Обработка под WSGI."""
+
+    @abstractmethod
+    async def __acall__(self, request):
+        """Обработка под ASGI."""
+
+
+class QueryBudgetMiddleware(HybridMiddleware):
+    """Учет SQL-запросов каждого представления.
+
+    При QUERY_INSPECT_HEADERS добавляет в ответ заголовки с числом
+    запросов, временем в БД и повторами. Если запросов больше, чем
+    указано в QUERY_BUDGETS для представления, пишет предупреждение в лог.
+    Бюджет ищется по ключу 'МЕТОД представление', а для GET и HEAD
+    также просто по имени представления.
+
+    Потоковый ответ выполняет запросы, пока отдается тело, уже после
+    заголовков. Для него учет продолжается до закрытия потока, бюджет
+    проверяется в конце, а заголовков с числом запросов нет.
+    """
+
+    def handle(self, request):
+        """Выполняем запрос под учетом."""
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        """Выполняем запрос под учетом."""
+        with QueryRecorder() as recorder:
+            response = await self.get_response(request)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        """Проверка бюджета и заголовки, для потока — после его закрытия."""
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response.streaming_content, recorder)
+            return response
+        self.check_budget(request, recorder)
+        if settings.QUERY_INSPECT_HEADERS:
+            response['X-DB-Query-Count'] = recorder.count
+            response['X-DB-Query-Time-Ms'] = recorder.duration_ms
+            response['X-DB-Duplicate-Queries'] = ','.join(
+                f'{key}:{number}'
+                for key, number in recorder.duplicates.items())
+        return response
+
+    def stream(self, request, content, recorder):
+        """Тело потокового ответа под тем же учетом."""
+        try:
+            with recorder:
+                yield from content
+        finally:
+            self.check_budget(request, recorder)
+
+    @staticmethod
+    def check_budget(request, recorder):
+        """Предупреждение в лог, если запрос превысил бюджет."""
+        view_name = (
+            request.resolver_match.view_name
+            if request.resolver_match else request.path
+        )
+        budget = settings.QUERY_BUDGETS.get(
+            f'{request.method} {view_name}',
+            settings.QUERY_BUDGETS.get(
+                view_name, settings.QUERY_BUDGET_DEFAULT)
+            if request.method in SAFE_METHODS
+            else settings.QUERY_BUDGET_DEFAULT)
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                '%s %s: %s запросов при бюджете %s, %s мс в БД, повторы: %s',
+                request.method, view_name, recorder.count, budget,
+                recorder.duration_ms, recorder.duplicates,
+            )
+
+
+class ReplicaPinMiddleware(HybridMiddleware):
+    """Чтение своих записей при работе с репликой.
+
+    Изменяющие запросы целиком читают из основной базы. Если запрос
+    что-то записал, клиент (по заголовку Authorization или сессии)
+    на REPLICA_PIN_SECONDS закрепляется за основной базой, пока
+    реплика догоняет изменения.
+    """
+
+    @staticmethod
+    def pin_key(request):
+        """Ключ клиента в кэше или None для анонимного запроса."""
+        credentials = request.META.get('HTTP_AUTHORIZATION') or (
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        if not credentials:
+            return None
+        digest = hashlib.sha1(credentials.encode()).hexdigest()
+        return f'db:pin:{digest}'
+
+    def handle(self, request):
+        """Выполняем запрос с нужной привязкой к базе."""
+        if not settings.DATABASE_ROUTERS:
+            return self.get_response(request)
+        key = self.pin_key(request)
+        tokens = self.pin(request, key is not None and cache.get(key, False))
+        try:
+            response = self.get_response(request)
+            if routers.written.get() and key is not None:
+                cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        finally:
+            self.unpin(tokens)
+        return response
+
+    async def __acall__(self, request):
+        """Выполняем запрос с нужной привязкой к базе."""
+        if not settings.DATABASE_ROUTERS:
+            return await self.get_response(request)
+        key = self.pin_key(request)
+        tokens = self.pin(
+            request, key is not None and await run(cache.get, key, False))
+        try:
+            response = await self.get_response(request)
+            if routers.written.get() and key is not None:
+                await run(cache.set, key, True, settings.REPLICA_PIN_SECONDS)
+        finally:
+            self.unpin(tokens)
+        return response
+
+    @staticmethod
+    def pin(request, recently_written):
+        """Привязываем запрос к основной базе или разрешаем реплику."""
+        return (
+            routers.pinned.set(
+                request.method not in SAFE_METHODS or recently_written),
+            routers.written.set(False),
+        )
+
+    @staticmethod
+    def unpin(tokens):
+        """Возвращаем привязку, действовавшую до запроса."""
+        pinned, written = tokens
+        routers.pinned.reset(pinned)
+        routers.written.reset(written)
@@ -1,12 +1,148 @@
 """Кстомная пагинация."""
 
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from foodgram.settings import PAGINATION_LIMIT
 
 
 class ProjectPagination(PageNumberPagination):
-    """Кастомный пагинатор для поддержки параметров page и limit."""
+    """Кастомный пагинатор для поддержки параметров page и limit.
+
+    С параметром cursor (для первой страницы пустым) включается
+    пагинация по ключу: следующая страница выбирается условием на поля
+    сортировки последнего объекта и id, без COUNT(*) и OFFSET. Стоимость
+    страницы не зависит от глубины, ответ без поля count.
+    """
 
     page_size = PAGINATION_LIMIT
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Страница по номеру или по курсору."""
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+        ordering = (
+            [self.flip(field) for field in self.ordering]
+            if reverse else self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        items = list(queryset[:self.page_size + 1])
+        has_more = len(items) > self.page_size
+        items = items[:self.page_size]
+        if reverse:
+            items.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.first = self.last = None
+        if items:
+            self.first = self.position(items[0])
+            self.last = self.position(items[-1])
+        else:
+            # Объекты за курсором удалили: страницу не к чему привязать,
+            # клиент начинает заново с пустого курсора.
+            self.has_next = self.has_previous = False
+        return items
+
+    def get_paginated_response(self, data):
+        """Ответ без count в режиме курсора."""
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_cursor_link(self.last, False)
+            if self.has_next else None,
+            'previous': self.get_cursor_link(self.first, True)
+            if self.has_previous else None,
+            'results': data,
+        })
+
+    def get_etag_state(self):
+        """Данные пагинации, от которых зависит ответ помимо объектов."""
+        if self.cursor_mode:
+            return self.has_next, self.has_previous
+        return self.page.paginator.count
+
+    def get_ordering(self, queryset):
+        """Сортировка queryset с id для однозначности."""
+        ordering = list(
+            queryset.query.order_by or queryset.model._meta.ordering)
+        if not {'pk', 'id', '-pk', '-id'} & set(ordering):
+            ordering.append('id')
+        return ordering
+
+    @staticmethod
+    def flip(field):
+        """Обратное направление сортировки поля."""
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def position(self, item):
+        """Значения полей сортировки объекта или словаря values()."""
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(item, dict):
+            return [item[name] for name in names]
+        return [getattr(item, name) for name in names]
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        """Условие «после позиции» для составной сортировки.
+
+        (a < x) OR (a = x AND b > y) OR (a = x AND b = y AND id > z)
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, position, reverse):
+        """Курсор: позиция и направление в base64."""
+        data = json.dumps({
+            'p': [value.isoformat() if isinstance(value, datetime)
+                  else value for value in position],
+            'r': reverse,
+        })
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Позиция и направление из курсора."""
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position, reverse = data['p'], bool(data['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_cursor_link(self, position, reverse):
+        """Ссылка на соседнюю страницу."""
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(position, reverse))
@@ -0,0 +1,131 @@
+"""Учет SQL-запросов, выполненных в блоке кода."""
+
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+NUMBERS_RE = re.compile(r'\b\d+\b')
+STRINGS_RE = re.compile(r"'(?:[^']|'')*'")
+IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+
+
+def fingerprint(sql):
+    """Отпечаток запроса без конкретных значений параметров."""
+    sql = STRINGS_RE.sub('%s', sql)
+    sql = NUMBERS_RE.sub('%s', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return hashlib.md5(' '.join(sql.split()).encode()).hexdigest()[:12]
+
+
+# Активные учеты запросов. Переменная контекста, а не обертка на
+# соединении текущего потока: под ASGI запросы одного HTTP-запроса
+# выполняются в разных потоках пула.
+active = ContextVar('query_recorders', default=())
+
+
+def record(execute, sql, params, many, context):
+    """Обертка над выполнением запроса для активных учетов."""
+    alias = context['connection'].alias
+    recorders = [
+        recorder for recorder in active.get() if recorder.watches(alias)]
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for recorder in recorders:
+            recorder.add(sql, duration)
+
+
+@receiver(connection_created)
+def install_recorder(sender, connection, **kwargs):
+    """Подключаем учет к каждому соединению один раз."""
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record)
+
+
+class QueryRecorder:
+    """Собирает число запросов, время в БД и повторяющиеся запросы.
+
+    Работает через execute_wrapper, поэтому не зависит от DEBUG. Учет
+    действует в контексте, где он открыт, включая задачи из него в
+    других потоках.
+    """
+
+    def __init__(self, using=None):
+        """Подключения, за которыми следим (по умолчанию все)."""
+        self.using = using
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.statements = {}
+        self._lock = threading.Lock()
+        self._token = None
+
+    def watches(self, alias):
+        """Учитываются ли запросы к базе alias."""
+        return self.using is None or alias in self.using
+
+    def add(self, sql, duration):
+        """Учитываем выполненный запрос."""
+        key = fingerprint(sql)
+        with self._lock:
+            self.duration += duration
+            self.count += 1
+            self.fingerprints[key] += 1
+            self.statements.setdefault(key, sql)
+
+    def __enter__(self):
+        """Начинаем учет запросов."""
+        self._token = active.set((*active.get(), self))
+        return self
+
+    def __exit__(self, *exc_info):
+        """Заканчиваем учет запросов."""
+        active.reset(self._token)
+
+    @property
+    def duration_ms(self):
+        """Время в БД в миллисекундах."""
+        return round(self.duration * 1000, 2)
+
+    @property
+    def duplicates(self):
+        """Отпечатки запросов, выполненных больше одного раза."""
+        return {
+            key: number for key, number in self.fingerprints.items()
+            if number > 1
+        }
+
+
+@contextmanager
+def assert_max_queries(max_queries, allow_duplicates=True, using=None):
+    """Проверка в тестах: блок укладывается в бюджет запросов.
+
+    Пример:
+        with assert_max_queries(6):
+            client.get('/api/recipes/')
+    """
+    with QueryRecorder(using) as recorder:
+        yield recorder
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(
+            f'выполнено {recorder.count} запросов, '
+            f'допустимо не больше {max_queries}')
+    if not allow_duplicates and recorder.duplicates:
+        problems.append(f'повторяющиеся запросы: {recorder.duplicates}')
+    if problems:
+        details = '\n'.join(
+            f'{number}x {recorder.statements[key]}'
+            for key, number in recorder.fingerprints.most_common())
+        raise AssertionError('; '.join(problems) + '\n' + details)
@@ -0,0 +1,51 @@
+"""Быстрый рендерер JSON."""
+
+import re
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Числа с плавающей точкой, которые json.dumps записал бы иначе:
+# с экспонентой у orjson или с ведущими нулями вместо экспоненты.
+FLOAT_MISMATCH_RE = re.compile(
+    rb'(?:^|[:,\[])-?(?:\d+(?:\.\d+)?[eE]|0\.0000)')
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029'))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же выводом байт в байт.
+
+    orjson работает только для компактного вывода без отступов, как
+    отвечает api. Типы, которых orjson не знает (даты, Decimal, ленивые
+    строки), кодирует encoder_class DRF. Если orjson не установлен, не
+    справился с данными или записал число с плавающей точкой не так,
+    как json, ответ строит обычный JSONRenderer. NaN и бесконечность
+    orjson пишет как null, хотя json со STRICT_JSON их не принимает;
+    полей с плавающей точкой в api нет.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Ответ в JSON."""
+        if (orjson is None or data is None or not self.compact
+                or self.ensure_ascii or self.get_indent(
+                    accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=(orjson.OPT_PASSTHROUGH_DATETIME
+                        | orjson.OPT_PASSTHROUGH_DATACLASS))
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if FLOAT_MISMATCH_RE.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # json.dumps оставляет эти символы как есть, а DRF их экранирует.
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
@@ -1,38 +1,58 @@
 """Сериализаторы для всех моделей."""
+from pathlib import PurePosixPath
+
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import (Case, IntegerField, Prefetch, Value, When,
+                              prefetch_related_objects)
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from .fields import Base64ImageField
+from .fields import (Base64ImageField, DeferredPrimaryKeyField,
+                     ImageVariantsField)
+from recipes import shopping
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
                             Recipe, ShoppingCart, Tag)
+from recipes.search import ingredient_index
+from recipes.storage import content_hash
 from users.models import SubscrUser
 
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    """Параметр recipes_limit или None, если он не задан или неверен."""
+    try:
+        limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return None
+    return limit if limit >= 0 else None
+
+
 class ReadUserSerializer(UserSerializer):
     """Сериализатор для получения юзера."""
 
     is_subscribed = serializers.SerializerMethodField(read_only=True)
+    avatar_variants = ImageVariantsField(source='avatar')
 
     class Meta:
         """Свойства."""
 
         model = User
         fields = ('email', 'id', 'username', 'first_name',
-                  'last_name', 'is_subscribed', 'avatar')
+                  'last_name', 'is_subscribed', 'avatar', 'avatar_variants')
 
     def get_is_subscribed(self, obj):
         """Получаем отметку подписки."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return bool(
             self.context.get('request')
             and self.context['request'].user.is_authenticated
             and obj.authors.filter(
-                author=self.context['request'].user).exists()
+                subscriber=self.context['request'].user).exists()
         )
 
 
@@ -52,12 +72,13 @@ class RecipeForSubscrSerializer(serializers.ModelSerializer):
     """Отображение рецепта в подписках."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField(source='image')
 
     class Meta:
         """Свойства."""
 
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class SubscrUserSerializer(ReadUserSerializer):
@@ -74,28 +95,26 @@ class SubscrUserSerializer(ReadUserSerializer):
             'email', 'id', 'username',
             'first_name', 'last_name',
             'is_subscribed', 'recipes',
-            'recipes_count', 'avatar',
+            'recipes_count', 'avatar', 'avatar_variants',
         )
 
     def get_recipes(self, obj):
-        """Получение рецепта(recipes)."""
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit is not None:
-            try:
-                limit = int(recipes_limit)
-                recipes = obj.recipes.all()[:limit]
-            except ValueError:
-                recipes = obj.recipes.all()
-        else:
-            recipes = obj.recipes.all()
+        """Получение рецепта(recipes).
 
+        Список подписок заранее загружает рецепты в latest_recipes.
+        """
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            limit = get_recipes_limit(self.context['request'])
+            if limit is not None:
+                recipes = recipes[:limit]
         return RecipeForSubscrSerializer(recipes, many=True,
                                          context=self.context).data
 
     def get_recipes_count(self, obj):
         """Получение количества рецепта(recipes_count)."""
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -173,6 +192,7 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
     ingredients = IngredientRecipeSerializer(
         source='ingredients_amout', many=True, read_only=True)
     image = Base64ImageField()
+    image_variants = ImageVariantsField(source='image')
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -182,10 +202,13 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'name', 'text', 'cooking_time',
                   'author', 'tags', 'ingredients',
-                  'is_favorited', 'is_in_shopping_cart', 'image')
+                  'is_favorited', 'is_in_shopping_cart', 'image',
+                  'image_variants')
 
     def get_is_favorited(self, obj):
         """Получение поля (is_favorited)."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return bool(
             request and request.user.is_authenticated
@@ -195,6 +218,8 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Получение поля (is_in_shopping_cart)."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return bool(
             request and request.user.is_authenticated
@@ -206,8 +231,7 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
 class IngredientRecipewriteSerializer(serializers.ModelSerializer):
     """Ингредиенты в рецепте при создании рецепта."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all())
+    id = DeferredPrimaryKeyField(queryset=Ingredient.objects.all())
 
     class Meta:
         """Свойства."""
@@ -221,8 +245,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
 
     ingredients = IngredientRecipewriteSerializer(
         many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True)
+    tags = DeferredPrimaryKeyField(queryset=Tag.objects.all(), many=True)
     image = Base64ImageField()
 
     class Meta:
@@ -254,6 +277,15 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         if not value:
             raise serializers.ValidationError(
                 'Поле ингредиентов не может быть пустым.')
+        existing = ingredient_index.existing(ingredient_ids)
+        if len(existing) != len(ingredient_ids):
+            message = self.fields['ingredients'].child.fields[
+                'id'].error_messages['does_not_exist']
+            raise serializers.ValidationError([
+                {} if ingredient['id'] in existing
+                else {'id': [message.format(pk_value=ingredient['id'])]}
+                for ingredient in value
+            ])
         return value
 
     def validate_tags(self, value):
@@ -263,15 +295,20 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
                 'Поле тегов не может быть пустым.')
         if len(value) != len(set(value)):
             raise serializers.ValidationError('Теги должны быть уникальными.')
-
-        return value
+        tags = Tag.objects.in_bulk(value)
+        for pk in value:
+            if pk not in tags:
+                raise serializers.ValidationError(
+                    self.fields['tags'].child_relation.error_messages[
+                        'does_not_exist'].format(pk_value=pk))
+        return [tags[pk] for pk in value]
 
     def create_ingredients(self, recipe, ingredients_data):
         """Создаем ингредиенты для рецепта."""
         IngredientRecipe.objects.bulk_create([
             IngredientRecipe(
                 recipe=recipe,
-                ingredient=ingredient.get('id'),
+                ingredient_id=ingredient.get('id'),
                 amount=ingredient.get('amount')
             ) for ingredient in ingredients_data
         ])
@@ -284,24 +321,92 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredients', None)
         tags_data = validated_data.pop('tags', None)
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags_data)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag) for tag in tags_data)
         self.create_ingredients(recipe, ingredients_data)
         return recipe
 
+    def update_ingredients(self, recipe, old_amounts, new_amounts):
+        """Меняем только добавленные, удаленные и измененные ингредиенты."""
+        removed = old_amounts.keys() - new_amounts.keys()
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+        changed = {
+            ingredient_id: amount
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id in old_amounts
+            and old_amounts[ingredient_id] != amount
+        }
+        if changed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=changed).update(
+                    amount=Case(*(
+                        When(ingredient_id=ingredient_id, then=Value(amount))
+                        for ingredient_id, amount in changed.items()
+                    ), output_field=IntegerField()))
+        added = new_amounts.keys() - old_amounts.keys()
+        if added:
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                                 amount=new_amounts[ingredient_id])
+                for ingredient_id in added)
+        return bool(removed or changed or added)
+
+    def update_tags(self, recipe, tags):
+        """Добавляем и убираем только изменившиеся теги."""
+        old_ids = set(Recipe.tags.through.objects.filter(
+            recipe=recipe).values_list('tag_id', flat=True))
+        new_ids = {tag.id for tag in tags}
+        if old_ids - new_ids:
+            recipe.tags.remove(*(old_ids - new_ids))
+        if new_ids - old_ids:
+            recipe.tags.add(*(new_ids - old_ids))
+        return old_ids != new_ids
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        """Обновление рецепта."""
+        """Обновление рецепта.
+
+        Пишутся только изменившиеся поля и связи; повторно присланная
+        та же картинка определяется по хешу и не сохраняется.
+        """
         ingredients_data = validated_data.pop('ingredients', None)
         tags_data = validated_data.pop('tags', None)
-        instance.tags.set(tags_data)
-        instance.ingredients.clear()
-        self.create_ingredients(instance, ingredients_data)
-        return super().update(instance, validated_data)
+        image = validated_data.get('image')
+        if image and instance.image and (
+                content_hash(image)
+                == PurePosixPath(instance.image.name).stem):
+            del validated_data['image']
+        shopping.lock_recipe(instance.pk)
+        old_amounts = shopping.recipe_amounts(instance.pk)
+        new_amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients_data
+        }
+        relations_changed = self.update_tags(instance, tags_data)
+        if self.update_ingredients(instance, old_amounts, new_amounts):
+            relations_changed = True
+            shopping.recipe_changed(instance.pk, old_amounts, new_amounts)
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if field == 'image' or getattr(instance, field) != value
+        ]
+        for field in changed_fields:
+            setattr(instance, field, validated_data[field])
+        if changed_fields or relations_changed:
+            instance.save(update_fields=[*changed_fields, 'updated_at'])
+        return instance
 
     def to_representation(self, instance):
         """Приведение данных в нужный вид."""
         request = self.context.get('request')
         context = {'request': request}
+        prefetch_related_objects(
+            [instance], 'tags', Prefetch(
+                'ingredients_amout',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient')))
         return RecipeDetailSerializer(instance, context=context).data
 
 
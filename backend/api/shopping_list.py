@@ -0,0 +1,56 @@
+"""Потоковая выгрузка списка покупок в разных форматах."""
+
+import csv
+import json
+from itertools import islice
+
+# Сколько строк списка отправлять клиенту одним куском.
+CHUNK_ROWS = 500
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        """Отдаем записанную строку."""
+        return value
+
+
+def txt_lines(rows):
+    """Строки текстового списка."""
+    yield 'Ваш список покупок:\n\n'
+    for name, measurement_unit, amount in rows:
+        yield f'• {name} — {amount} ({measurement_unit})\n'
+
+
+def csv_lines(rows):
+    """Строки csv с заголовком."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def json_lines(rows):
+    """Массив json, по одному ингредиенту в строке."""
+    separator = '[\n'
+    for name, measurement_unit, amount in rows:
+        yield separator + json.dumps(
+            {'name': name, 'measurement_unit': measurement_unit,
+             'amount': amount},
+            ensure_ascii=False)
+        separator = ',\n'
+    yield '[]\n' if separator == '[\n' else '\n]\n'
+
+
+EXPORT_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', txt_lines),
+    'csv': ('text/csv; charset=utf-8', csv_lines),
+    'json': ('application/json', json_lines),
+}
+
+
+def encoded_chunks(lines, size=CHUNK_ROWS):
+    """Склеиваем строки в крупные куски, чтобы не отправлять по одной."""
+    while chunk := ''.join(islice(lines, size)):
+        yield chunk.encode('utf-8')
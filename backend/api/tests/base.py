@@ -0,0 +1,79 @@
+"""Общая подготовка данных для тестов api."""
+
+import io
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+def png_image():
+    """Картинка 1x1 в PNG."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (1, 1), 'white').save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name='image.png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CACHES=LOCMEM_CACHES)
+class ApiTestCase(TestCase):
+    """Тесты api с временным каталогом медиа и кэшем в памяти."""
+
+    @classmethod
+    def tearDownClass(cls):
+        """Удаляем загруженные картинки."""
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def create_user(username, **fields):
+        """Пользователь с уникальной почтой."""
+        return User.objects.create_user(
+            email=f'{username}@example.com', username=username, **{
+                'first_name': 'Имя', 'last_name': 'Фамилия',
+                'password': 'password-123', **fields})
+
+    @staticmethod
+    def create_tag(slug):
+        """Тег с названием по slug."""
+        return Tag.objects.create(name=f'Тег {slug}', slug=slug)
+
+    @staticmethod
+    def create_ingredient(name, unit='г'):
+        """Ингредиент справочника."""
+        return Ingredient.objects.create(name=name, measurement_unit=unit)
+
+    @staticmethod
+    def create_recipe(author, name='Рецепт', tags=(), amounts=None):
+        """Рецепт с тегами и ингредиентами {ингредиент: количество}."""
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Текст', cooking_time=10,
+            image=png_image())
+        recipe.tags.set(tags)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                             amount=amount)
+            for ingredient, amount in (amounts or {}).items())
+        return recipe
+
+    @staticmethod
+    def client_for(user=None):
+        """Клиент пользователя с токеном или анонимный."""
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
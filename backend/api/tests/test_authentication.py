@@ -0,0 +1,65 @@
+"""Кэш аутентификации по токену."""
+
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+
+from .base import ApiTestCase
+from api.authentication import shared_key, token_cache
+
+
+class CachedTokenAuthenticationTests(ApiTestCase):
+    """Записи кэша перестают действовать после выхода и деактивации."""
+
+    def setUp(self):
+        """Пользователь с токеном и его проверенный запрос."""
+        self.user = self.create_user('reader')
+        self.client = self.client_for(self.user)
+        self.key = Token.objects.get(user=self.user).key
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        self.entry = token_cache.get(self.key)
+        self.assertIsNotNone(self.entry)
+
+    def tearDown(self):
+        """Кэш процесса общий для всех тестов."""
+        token_cache.discard([self.key])
+        cache.clear()
+
+    def stale_worker(self):
+        """Другой воркер еще помнит запись, сделанную до изменений."""
+        token_cache.set(self.key, self.entry)
+
+    def test_cached_user_has_no_password(self):
+        """В записи кэша нет хеша пароля."""
+        self.assertNotIn(self.user.password, self.entry[1])
+
+    def test_logout(self):
+        """После выхода токен не действует ни в одном процессе."""
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.stale_worker()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_deactivation(self):
+        """Деактивированный пользователь сразу теряет доступ."""
+        self.user.is_active = False
+        self.user.save()
+        self.stale_worker()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_profile_change(self):
+        """Правка профиля видна запросам с закэшированным токеном."""
+        self.user.first_name = 'Новое'
+        self.user.save()
+        self.stale_worker()
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.json()['first_name'], 'Новое')
+
+    def test_unknown_tokens_leave_nothing_in_cache(self):
+        """Несуществующие токены не создают поколений в общем кэше."""
+        client = self.client_for()
+        for index in range(5):
+            key = f'bogus{index}'
+            client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+            self.assertEqual(client.get('/api/users/me/').status_code, 401)
+            self.assertIsNone(cache.get(shared_key(key, 'generation')))
+            self.assertIsNone(token_cache.get(key))
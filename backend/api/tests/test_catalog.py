@@ -0,0 +1,79 @@
+"""Кэш справочников ингредиентов и тегов."""
+
+import gzip
+
+from import_export.signals import post_import
+
+from .base import ApiTestCase
+from recipes.catalog import INGREDIENTS, TAGS, get_version
+from recipes.models import Ingredient, Tag
+
+
+class CatalogCacheTests(ApiTestCase):
+    """Версии справочников и ответы 304."""
+
+    def setUp(self):
+        """Теги и ингредиенты с новыми версиями справочников."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag = self.create_tag('breakfast')
+            self.ingredient = self.create_ingredient('Соль')
+        self.client = self.client_for()
+
+    def assert_bumps(self, name, change):
+        """change меняет версию справочника name после фиксации."""
+        before = get_version(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+            self.assertEqual(get_version(name), before)
+        self.assertNotEqual(get_version(name), before)
+
+    def test_save_and_delete_bump_version(self):
+        """Сохранение и удаление меняют версию."""
+        self.assert_bumps(TAGS, lambda: self.create_tag('dinner'))
+        self.assert_bumps(TAGS, self.tag.delete)
+        self.assert_bumps(
+            INGREDIENTS, lambda: self.create_ingredient('Перец'))
+        self.assert_bumps(INGREDIENTS, self.ingredient.delete)
+
+    def test_import_bumps_version(self):
+        """Импорт из админки меняет версию своего справочника."""
+        self.assert_bumps(INGREDIENTS, lambda: post_import.send(
+            sender=None, model=Ingredient))
+        self.assert_bumps(TAGS, lambda: post_import.send(
+            sender=None, model=Tag))
+
+    def test_not_modified(self):
+        """Совпадающий ETag, в том числе слабый, — 304."""
+        for url in ('/api/tags/', '/api/ingredients/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Cache-Control'], 'no-cache')
+                etag = response['ETag']
+                for header in (etag, f'W/{etag}', f'"other", {etag}'):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=header)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response['ETag'], etag)
+
+    def test_gzip(self):
+        """Сжатый ответ со своим ETag распаковывается в тот же JSON."""
+        plain = self.client.get('/api/tags/')
+        packed = self.client.get('/api/tags/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(packed['Content-Encoding'], 'gzip')
+        self.assertNotEqual(packed['ETag'], plain['ETag'])
+        self.assertEqual(gzip.decompress(packed.content), plain.content)
+        self.assertEqual(self.client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=packed['ETag']).status_code, 304)
+
+    def test_change_invalidates_response(self):
+        """После изменения справочника старый ETag не подходит."""
+        response = self.client.get('/api/tags/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_tag('dinner')
+        fresh = self.client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(
+            [tag['slug'] for tag in fresh.json()],
+            ['breakfast', 'dinner'])
@@ -0,0 +1,84 @@
+"""Условные GET-запросы по ETag."""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import ApiTestCase
+
+
+class ConditionalGetTests(ApiTestCase):
+    """ETag списков и карточек рецептов."""
+
+    def setUp(self):
+        """Рецепт автора и читатель."""
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        self.recipe = self.create_recipe(self.author)
+        self.client = self.client_for(self.reader)
+        self.urls = ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/')
+
+    def etags(self):
+        """ETag списка и карточки."""
+        etags = []
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            etags.append(response['ETag'])
+        return etags
+
+    def assert_changed(self, change):
+        """После change меняются ETag списка и карточки."""
+        before = self.etags()
+        change()
+        for url, old, new in zip(self.urls, before, self.etags()):
+            with self.subTest(url=url):
+                self.assertNotEqual(old, new)
+
+    def test_not_modified(self):
+        """Совпадающий If-None-Match — 304 без тела."""
+        for url, etag in zip(self.urls, self.etags()):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(response.content, b'')
+
+    def test_etag_depends_on_user(self):
+        """Разные пользователи получают разные ETag."""
+        etag = self.etags()[0]
+        response = self.client_for().get(
+            self.urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_favorite_changes_etag(self):
+        """Добавление в избранное."""
+        self.assert_changed(lambda: self.client.post(
+            f'/api/recipes/{self.recipe.pk}/favorite/'))
+
+    def test_cart_changes_etag(self):
+        """Добавление в список покупок."""
+        self.assert_changed(lambda: self.client.post(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/'))
+
+    def test_subscription_changes_etag(self):
+        """Подписка на автора."""
+        self.assert_changed(lambda: self.client.post(
+            f'/api/users/{self.author.pk}/subscribe/'))
+
+    def test_author_profile_changes_etag(self):
+        """Правка профиля автора."""
+        def change():
+            self.author.first_name = 'Новое'
+            self.author.save()
+        self.assert_changed(change)
+
+    def test_list_counts_once(self):
+        """Полный ответ списка не пагинирует queryset второй раз."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        counts = [
+            query['sql'] for query in queries
+            if 'COUNT(' in query['sql'].upper()]
+        self.assertEqual(len(counts), 1, counts)
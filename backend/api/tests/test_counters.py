@@ -0,0 +1,88 @@
+"""Счетчики избранного, рецептов и подписчиков."""
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from .base import ApiTestCase
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import SubscrUser, User
+
+
+class CounterTests(ApiTestCase):
+    """Счетчики меняются вместе с данными."""
+
+    def setUp(self):
+        """Автор с двумя рецептами и читатель."""
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        self.recipe = self.create_recipe(self.author, 'Блины')
+        self.other_recipe = self.create_recipe(self.author, 'Каша')
+        self.client = self.client_for(self.reader)
+
+    def counters(self):
+        """Счетчики рецепта и автора."""
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        return (self.recipe.favorites_count, self.author.recipes_count,
+                self.author.subscribers_count)
+
+    def test_favorite(self):
+        """Избранное через api."""
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.client.post(url)
+        self.client_for(self.author).post(url)
+        self.assertEqual(self.counters(), (2, 2, 0))
+        self.client.delete(url)
+        self.assertEqual(self.counters(), (1, 2, 0))
+
+    def test_subscribe(self):
+        """Подписка через api и число рецептов в ответе подписок."""
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['recipes_count'], 2)
+        self.assertEqual(self.counters(), (0, 2, 1))
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.json()['results'][0]['recipes_count'], 2)
+        self.client.delete(url)
+        self.assertEqual(self.counters(), (0, 2, 0))
+
+    def test_recipe_create_and_delete(self):
+        """Рецепты автора."""
+        self.create_recipe(self.author, 'Суп')
+        self.assertEqual(self.counters(), (0, 3, 0))
+        response = self.client_for(self.author).delete(
+            f'/api/recipes/{self.other_recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counters(), (0, 2, 0))
+
+    def test_bulk_delete_and_cascade(self):
+        """Массовое удаление и каскад от удаленного пользователя."""
+        readers = [self.reader, *(
+            self.create_user(f'reader{index}') for index in range(3))]
+        for reader in readers:
+            FavoriteRecipe.objects.create(user=reader, recipe=self.recipe)
+            SubscrUser.objects.create(subscriber=reader, author=self.author)
+        self.assertEqual(self.counters(), (4, 2, 4))
+        FavoriteRecipe.objects.filter(user__in=readers[:2]).delete()
+        SubscrUser.objects.filter(subscriber__in=readers[:2]).delete()
+        self.assertEqual(self.counters(), (2, 2, 2))
+        readers[2].delete()
+        self.assertEqual(self.counters(), (1, 2, 1))
+        Recipe.objects.filter(pk=self.other_recipe.pk).delete()
+        self.assertEqual(self.counters(), (1, 1, 1))
+
+    def test_reconcile(self):
+        """Команда сверки исправляет расхождения."""
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.recipe)
+        Recipe.objects.filter(pk=self.recipe.pk).update(favorites_count=7)
+        User.objects.filter(pk=self.author.pk).update(
+            recipes_count=0, subscribers_count=3)
+        stdout = StringIO()
+        call_command('reconcile_counters', stdout=stdout)
+        self.assertEqual(self.counters(), (1, 2, 0))
+        self.assertIn('recipe.favorites_count: исправлено строк 1',
+                      stdout.getvalue())
+        self.assertIn('user.recipes_count: исправлено строк 1',
+                      stdout.getvalue())
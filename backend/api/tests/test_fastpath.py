@@ -0,0 +1,110 @@
+"""Быстрая сериализация совпадает с DRF байт в байт."""
+
+import datetime
+import decimal
+from unittest import mock
+
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from .base import ApiTestCase, png_image
+from api.fastpath import FastReadMixin, serialize_rows
+from api.renderers import FastJSONRenderer
+from api.serializers import IngredientSerializer, TagSerializer
+from recipes.models import FavoriteRecipe, Ingredient, ShoppingCart, Tag
+from users.models import SubscrUser
+
+
+def stock_render(self, data, accepted_media_type=None,
+                 renderer_context=None):
+    """Вывод обычного JSONRenderer."""
+    return JSONRenderer.render(
+        self, data, accepted_media_type, renderer_context)
+
+
+class FastPathTests(ApiTestCase):
+    """Ответы на чтение с быстрым путем и без него."""
+
+    def setUp(self):
+        """Рецепты с непростыми строками, подписка и отметки."""
+        self.author = self.create_user('author')
+        self.author.avatar = png_image()
+        self.author.save()
+        self.reader = self.create_user('reader', first_name='Читатель "Ё"')
+        with self.captureOnCommitCallbacks(execute=True):
+            tags = [self.create_tag(slug) for slug in ('breakfast', 'dinner')]
+            salt = self.create_ingredient('Соль')
+            milk = self.create_ingredient('Молоко', 'мл')
+        self.recipe = self.create_recipe(
+            self.author, 'Суп \u2028 «с» \U0001F372', tags,
+            {salt: 5, milk: 300})
+        self.recipe.text = 'Строка\nвторая\u2029 и \\ обратная черта'
+        self.recipe.save()
+        self.create_recipe(self.author, 'Каша', tags[:1], {milk: 200})
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        SubscrUser.objects.create(subscriber=self.reader, author=self.author)
+
+    def responses(self, client, urls):
+        """Тела ответов на urls."""
+        bodies = []
+        for url in urls:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            bodies.append(response.content)
+        return bodies
+
+    def test_read_endpoints(self):
+        """Списки и карточки рецептов и пользователей."""
+        urls = [
+            '/api/recipes/',
+            '/api/recipes/?cursor=&limit=1',
+            f'/api/recipes/{self.recipe.pk}/',
+            '/api/users/',
+            f'/api/users/{self.author.pk}/',
+        ]
+        clients = {
+            'аноним': (self.client_for(), urls),
+            'читатель': (self.client_for(self.reader), [
+                *urls, '/api/users/me/', '/api/users/subscriptions/',
+                '/api/users/subscriptions/?recipes_limit=1']),
+        }
+        for name, (client, client_urls) in clients.items():
+            with self.subTest(client=name):
+                fast = self.responses(client, client_urls)
+                with mock.patch.object(
+                        FastReadMixin, 'fast', lambda self, serializer:
+                        serializer), mock.patch.object(
+                        FastJSONRenderer, 'render', stock_render):
+                    stock = self.responses(client, client_urls)
+                for url, fast_body, stock_body in zip(
+                        client_urls, fast, stock):
+                    self.assertEqual(fast_body, stock_body, url)
+
+    def test_catalog_rows(self):
+        """Справочники по строкам values()."""
+        for model, serializer_class in ((Ingredient, IngredientSerializer),
+                                        (Tag, TagSerializer)):
+            with self.subTest(model=model.__name__):
+                queryset = model.objects.all()
+                self.assertEqual(
+                    FastJSONRenderer().render(
+                        serialize_rows(serializer_class, queryset)),
+                    JSONRenderer().render(
+                        serializer_class(queryset, many=True).data))
+
+    def test_renderer(self):
+        """Рендерер на данных, которые orjson пишет по-своему."""
+        cases = [
+            {'text': 'a\u2028b\u2029c', 'emoji': '\U0001F372'},
+            {'float': 1e-07, 'big': 1e20, 'small': 0.00001},
+            {'date': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc)},
+            {'decimal': decimal.Decimal('1.50'),
+             'lazy': gettext_lazy('Рецепт')},
+            [1, -2, 3.5, None, True, 'строка "в кавычках"'],
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                self.assertEqual(FastJSONRenderer().render(data),
+                                 JSONRenderer().render(data))
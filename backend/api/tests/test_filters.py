@@ -0,0 +1,86 @@
+"""Фильтры списка рецептов."""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import ApiTestCase
+from recipes.models import FavoriteRecipe
+
+
+class TagFilterTests(ApiTestCase):
+    """Фильтр по тегам с режимами any и all."""
+
+    def setUp(self):
+        """Рецепты с разными наборами тегов."""
+        self.author = self.create_user('author')
+        with self.captureOnCommitCallbacks(execute=True):
+            breakfast, dinner, lunch = (
+                self.create_tag(slug) for slug in
+                ('breakfast', 'dinner', 'lunch'))
+        self.both = self.create_recipe(
+            self.author, 'Оба', [breakfast, dinner])
+        self.breakfast = self.create_recipe(
+            self.author, 'Завтрак', [breakfast])
+        self.all_three = self.create_recipe(
+            self.author, 'Все', [breakfast, dinner, lunch])
+        self.lunch = self.create_recipe(self.author, 'Обед', [lunch])
+        self.client = self.client_for(self.author)
+
+    def ids(self, **params):
+        """id рецептов в ответе."""
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(recipe['id'] for recipe in response.json()['results'])
+
+    def test_any(self):
+        """По умолчанию подходит любой из тегов, без повторов."""
+        expected = sorted(
+            [self.both.id, self.breakfast.id, self.all_three.id])
+        self.assertEqual(self.ids(tags=['breakfast', 'dinner']), expected)
+        self.assertEqual(
+            self.ids(tags=['breakfast', 'dinner'], tags_match='any'),
+            expected)
+
+    def test_all(self):
+        """tags_match=all требует все теги."""
+        self.assertEqual(
+            self.ids(tags=['breakfast', 'dinner'], tags_match='all'),
+            sorted([self.both.id, self.all_three.id]))
+        self.assertEqual(
+            self.ids(tags=['breakfast', 'lunch'], tags_match='all'),
+            [self.all_three.id])
+
+    def test_count_without_duplicates(self):
+        """count совпадает с числом разных рецептов."""
+        response = self.client.get(
+            '/api/recipes/', {'tags': ['breakfast', 'dinner', 'lunch']})
+        self.assertEqual(response.json()['count'], 4)
+
+    def test_combined_with_other_filters(self):
+        """Теги вместе с избранным и автором."""
+        FavoriteRecipe.objects.create(user=self.author, recipe=self.both)
+        FavoriteRecipe.objects.create(user=self.author, recipe=self.lunch)
+        self.assertEqual(
+            self.ids(tags=['dinner'], is_favorited=1,
+                     author=self.author.id),
+            [self.both.id])
+
+    def test_invalid_values(self):
+        """Неизвестный тег или режим — ошибка 400."""
+        for params in ({'tags': ['unknown']},
+                       {'tags': ['lunch'], 'tags_match': 'some'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/recipes/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_no_join_on_tags(self):
+        """Фильтр строится на EXISTS, а не на соединении с тегами."""
+        with CaptureQueriesContext(connection) as queries:
+            self.ids(tags=['breakfast', 'dinner'], tags_match='all')
+        page_queries = [
+            query['sql'] for query in queries
+            if 'recipes_recipe_tags' in query['sql']
+            and 'EXISTS' in query['sql'].upper()]
+        self.assertTrue(page_queries)
+        for sql in page_queries:
+            self.assertNotIn('DISTINCT', sql.upper())
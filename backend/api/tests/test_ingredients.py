@@ -0,0 +1,53 @@
+"""Поиск ингредиентов для автодополнения."""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import ApiTestCase
+
+
+class IngredientSearchTests(ApiTestCase):
+    """Параметр name списка ингредиентов."""
+
+    def setUp(self):
+        """Ингредиенты создаются с новой версией справочника."""
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ('Молоко', 'Сгущённое молоко', 'Мука', 'Ёжевика',
+                         'Соль'):
+                self.create_ingredient(name)
+        self.client = self.client_for()
+
+    def names(self, **params):
+        """Названия найденных ингредиентов по порядку."""
+        response = self.client.get('/api/ingredients/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_prefix_before_substring(self):
+        """Совпадения по началу идут раньше совпадений внутри названия."""
+        self.assertEqual(
+            self.names(name='мол'), ['Молоко', 'Сгущённое молоко'])
+
+    def test_case_and_yo(self):
+        """Регистр и ё не учитываются."""
+        self.assertEqual(self.names(name='ЕЖЕ'), ['Ёжевика'])
+        self.assertEqual(self.names(name='сгущен'), ['Сгущённое молоко'])
+
+    def test_limit(self):
+        """Выдачу можно ограничить."""
+        self.assertEqual(self.names(name='м', limit=1), ['Молоко'])
+
+    def test_empty_name_returns_full_list(self):
+        """Пустой name — весь справочник, как без параметра."""
+        full = self.names()
+        self.assertEqual(len(full), 5)
+        for name in ('', ' '):
+            with self.subTest(name=name):
+                self.assertEqual(self.names(name=name), full)
+
+    def test_search_without_queries(self):
+        """Поиск по построенному индексу не обращается к базе."""
+        self.names(name='мол')
+        with CaptureQueriesContext(connection) as queries:
+            self.names(name='мук')
+        self.assertEqual(len(queries), 0, [q['sql'] for q in queries])
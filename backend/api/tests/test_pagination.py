@@ -0,0 +1,63 @@
+"""Пагинация по курсору."""
+
+from .base import ApiTestCase
+from recipes.models import Recipe
+
+
+class CursorPaginationTests(ApiTestCase):
+    """Переходы по ссылкам next и previous."""
+
+    def setUp(self):
+        """Пять рецептов одного автора."""
+        self.author = self.create_user('author')
+        for index in range(5):
+            self.create_recipe(self.author, f'Рецепт {index}')
+        self.client = self.client_for()
+
+    def get(self, url):
+        """Ответ 200 в виде словаря."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_pages_match_full_list(self):
+        """Страницы по курсору вперед и назад совпадают со списком."""
+        expected = [
+            recipe['id'] for recipe in
+            self.get('/api/recipes/?limit=10')['results']]
+        pages = [self.get('/api/recipes/?cursor=&limit=2')]
+        while pages[-1]['next']:
+            pages.append(self.get(pages[-1]['next']))
+        self.assertEqual(
+            [recipe['id'] for page in pages for recipe in page['results']],
+            expected)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('count', pages[0])
+        previous = self.get(pages[-1]['previous'])
+        self.assertEqual(previous['results'], pages[-2]['results'])
+
+    def test_empty_page_after_delete(self):
+        """Рецепты за курсором удалили: пустая страница без ссылок."""
+        first = self.get('/api/recipes/?cursor=&limit=2')
+        ids = [recipe['id'] for recipe in first['results']]
+        Recipe.objects.exclude(pk__in=ids).delete()
+        page = self.get(first['next'])
+        self.assertEqual(page['results'], [])
+        self.assertIsNone(page['next'])
+        self.assertIsNone(page['previous'])
+
+    def test_empty_page_before_reverse_cursor(self):
+        """Пустая страница при переходе назад тоже без ссылок."""
+        first = self.get('/api/recipes/?cursor=&limit=2')
+        second = self.get(first['next'])
+        Recipe.objects.filter(
+            pk__in=[recipe['id'] for recipe in first['results']]).delete()
+        page = self.get(second['previous'])
+        self.assertEqual(page['results'], [])
+        self.assertIsNone(page['next'])
+        self.assertIsNone(page['previous'])
+
+    def test_invalid_cursor(self):
+        """Испорченный курсор — 404."""
+        response = self.client.get('/api/recipes/?cursor=broken')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,160 @@
+"""Бюджеты SQL-запросов рецептов и подписок.
+
+Число запросов не должно расти вместе с данными: списки проверяются на
+маленьком и на большом наборе, и оба укладываются в бюджет из
+QUERY_BUDGETS.
+"""
+
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.querycount import assert_max_queries
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, Tag)
+from users.models import SubscrUser, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(TestCase):
+    """Чтение рецептов и подписок укладывается в бюджет запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Теги, ингредиенты и читатель."""
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {index}', slug=f'tag-{index}')
+            for index in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(5)
+        ]
+        cls.reader = cls.create_user('reader')
+
+    def setUp(self):
+        """Авторы добавляются в каждом тесте."""
+        self.authors = []
+
+    @classmethod
+    def tearDownClass(cls):
+        """Удаляем загруженные картинки."""
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def create_user(username):
+        """Пользователь с уникальной почтой."""
+        return User.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            first_name='Имя', last_name='Фамилия', password='password-123')
+
+    def add_authors(self, number, recipes_per_author=3):
+        """Авторы с рецептами, на которых подписан читатель.
+
+        Часть рецептов в избранном и в списке покупок читателя.
+        """
+        for _ in range(number):
+            author = self.create_user(f'author{len(self.authors)}')
+            self.authors.append(author)
+            SubscrUser.objects.create(subscriber=self.reader, author=author)
+            for index in range(recipes_per_author):
+                recipe = Recipe.objects.create(
+                    author=author, name=f'Рецепт {index}', text='Текст',
+                    cooking_time=10,
+                    image=ContentFile(b'image', name='image.png'))
+                recipe.tags.set(self.tags[:index + 1])
+                IngredientRecipe.objects.bulk_create(
+                    IngredientRecipe(
+                        recipe=recipe, ingredient=ingredient, amount=index + 1)
+                    for ingredient in self.ingredients[:index + 2])
+                if index == 0:
+                    FavoriteRecipe.objects.create(
+                        user=self.reader, recipe=recipe)
+                    ShoppingCart.objects.create(
+                        user=self.reader, recipe=recipe)
+
+    def clients(self):
+        """Анонимный клиент и клиент читателя."""
+        anonymous = APIClient()
+        reader = APIClient()
+        token, _ = Token.objects.get_or_create(user=self.reader)
+        reader.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return {'аноним': anonymous, 'читатель': reader}
+
+    def assert_budget(self, view_name, url, client):
+        """Запрос укладывается в бюджет и возвращает 200."""
+        with assert_max_queries(settings.QUERY_BUDGETS[view_name]) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return queries.count
+
+    def assert_constant(self, view_name, url, client):
+        """Число запросов не зависит от объема данных.
+
+        Первый запрос еще проверяет токен в базе, поэтому сравниваются
+        повторные.
+        """
+        self.add_authors(2)
+        self.assert_budget(view_name, url, client)
+        small = self.assert_budget(view_name, url, client)
+        self.add_authors(6)
+        large = self.assert_budget(view_name, url, client)
+        self.assertEqual(small, large)
+
+    def test_recipe_list(self):
+        """Список рецептов."""
+        for name, client in self.clients().items():
+            with self.subTest(client=name):
+                self.assert_constant(
+                    'api:recipes-list', '/api/recipes/?limit=20', client)
+
+    def test_recipe_list_cursor(self):
+        """Список рецептов с пагинацией по курсору."""
+        for name, client in self.clients().items():
+            with self.subTest(client=name):
+                self.assert_constant(
+                    'api:recipes-list', '/api/recipes/?cursor=', client)
+
+    def test_recipe_detail(self):
+        """Карточка рецепта."""
+        self.add_authors(1)
+        recipe = Recipe.objects.first()
+        for name, client in self.clients().items():
+            with self.subTest(client=name):
+                self.assert_budget(
+                    'api:recipes-detail', f'/api/recipes/{recipe.pk}/',
+                    client)
+
+    def test_subscriptions(self):
+        """Подписки с последними рецептами авторов."""
+        client = self.clients()['читатель']
+        for url in ('/api/users/subscriptions/',
+                    '/api/users/subscriptions/?recipes_limit=2'):
+            with self.subTest(url=url):
+                self.assert_constant('api:users-subscriptions', url, client)
+
+    def test_streaming_response_is_measured(self):
+        """Запросы потокового ответа учитываются при закрытии потока."""
+        self.add_authors(1)
+        client = self.clients()['читатель']
+        view_name = 'api:recipes-download-shopping-cart'
+        with override_settings(QUERY_BUDGETS={view_name: 0}):
+            response = client.get('/api/recipes/download_shopping_cart/')
+            with self.assertLogs('foodgram.queries', 'WARNING') as logs:
+                b''.join(response.streaming_content)
+                response.close()
+        self.assertIn(view_name, logs.output[0])
@@ -0,0 +1,62 @@
+"""Выгрузка и загрузка рецептов в NDJSON."""
+
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from .base import ApiTestCase
+from recipes.models import Recipe
+
+
+class RecipeTransferTests(ApiTestCase):
+    """Команды export_recipes и import_recipes."""
+
+    def setUp(self):
+        """Два рецепта с тегами и ингредиентами."""
+        self.author = self.create_user('author')
+        tags = [self.create_tag('breakfast'), self.create_tag('dinner')]
+        milk = self.create_ingredient('Молоко', 'мл')
+        flour = self.create_ingredient('Мука')
+        self.create_recipe(self.author, 'Блины', tags,
+                           {milk: 500, flour: 200})
+        self.create_recipe(self.author, 'Каша', tags[:1], {milk: 300})
+
+    def export(self):
+        """Строки выгрузки из stdout команды."""
+        stdout, stderr = StringIO(), StringIO()
+        call_command('export_recipes', '-', stdout=stdout, stderr=stderr)
+        self.assertIn('Выгружено рецептов: 2', stderr.getvalue())
+        return stdout.getvalue().splitlines()
+
+    def test_export_to_stdout(self):
+        """Выгрузка пишется в stdout команды, рецепт на строку."""
+        recipes = [json.loads(line) for line in self.export()]
+        self.assertEqual(
+            [(recipe['name'], recipe['author'], recipe['tags'])
+             for recipe in recipes],
+            [('Блины', 'author@example.com', ['breakfast', 'dinner']),
+             ('Каша', 'author@example.com', ['breakfast'])])
+        self.assertEqual(recipes[0]['ingredients'], [
+            {'name': 'Молоко', 'measurement_unit': 'мл', 'amount': 500},
+            {'name': 'Мука', 'measurement_unit': 'г', 'amount': 200},
+        ])
+
+    def test_round_trip(self):
+        """Загрузка выгрузки восстанавливает рецепты."""
+        lines = self.export()
+        Recipe.objects.all().delete()
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.ndjson', encoding='utf-8',
+                delete=False) as file:
+            file.write('\n'.join([*lines, '{"name": "Без автора"}']))
+        self.addCleanup(os.remove, file.name)
+        stdout = StringIO()
+        call_command('import_recipes', file.name, stdout=stdout)
+        self.assertIn('Загружено рецептов: 2, пропущено: 1',
+                      stdout.getvalue())
+        self.assertEqual(self.export(), lines)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 2)
@@ -0,0 +1,99 @@
+"""Изменение рецепта пишет только изменившиеся строки."""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import ApiTestCase
+from recipes.models import IngredientRecipe, Recipe
+
+
+class RecipeUpdateTests(ApiTestCase):
+    """PATCH рецепта сравнивает присланное с сохраненным."""
+
+    def setUp(self):
+        """Рецепт с двумя тегами и двумя ингредиентами."""
+        self.author = self.create_user('author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags = [self.create_tag(slug)
+                         for slug in ('breakfast', 'dinner', 'lunch')]
+            self.ingredients = [self.create_ingredient(name)
+                                for name in ('Мука', 'Соль', 'Сахар')]
+        self.recipe = self.create_recipe(
+            self.author, 'Блины', self.tags[:2],
+            {self.ingredients[0]: 200, self.ingredients[1]: 5})
+        self.client = self.client_for(self.author)
+        self.data = {
+            'name': 'Блины',
+            'text': 'Текст',
+            'cooking_time': 10,
+            'tags': [tag.pk for tag in self.tags[:2]],
+            'ingredients': [
+                {'id': self.ingredients[0].pk, 'amount': 200},
+                {'id': self.ingredients[1].pk, 'amount': 5},
+            ],
+        }
+
+    def patch(self, **changes):
+        """PATCH рецепта и запросы, которые что-то записали."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/', {**self.data, **changes},
+                format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [
+            query['sql'] for query in queries
+            if query['sql'].split(None, 1)[0].upper() in (
+                'INSERT', 'UPDATE', 'DELETE')
+        ]
+
+    def amount_rows(self):
+        """Строки ингредиентов рецепта {ингредиент: (id строки, число)}."""
+        return {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in IngredientRecipe.objects.filter(
+                recipe=self.recipe).values_list(
+                    'pk', 'ingredient_id', 'amount')}
+
+    def test_unchanged(self):
+        """Те же данные ничего не пишут."""
+        self.recipe.refresh_from_db()
+        updated_at = self.recipe.updated_at
+        self.assertEqual(self.patch(), [])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.updated_at, updated_at)
+
+    def test_name_only(self):
+        """Новое название — одна запись в таблицу рецептов."""
+        rows = self.amount_rows()
+        writes = self.patch(name='Оладьи')
+        self.assertEqual(len(writes), 1, writes)
+        self.assertIn('recipes_recipe"', writes[0])
+        self.assertEqual(self.amount_rows(), rows)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).name, 'Оладьи')
+
+    def test_ingredients_diff(self):
+        """Меняются, добавляются и удаляются только нужные строки."""
+        rows = self.amount_rows()
+        self.patch(ingredients=[
+            {'id': self.ingredients[0].pk, 'amount': 250},
+            {'id': self.ingredients[2].pk, 'amount': 30},
+        ])
+        new_rows = self.amount_rows()
+        self.assertEqual(set(new_rows), {
+            self.ingredients[0].pk, self.ingredients[2].pk})
+        self.assertEqual(new_rows[self.ingredients[0].pk],
+                         (rows[self.ingredients[0].pk][0], 250))
+        self.assertEqual(new_rows[self.ingredients[2].pk][1], 30)
+
+    def test_tags_diff(self):
+        """Убирается и добавляется только изменившийся тег."""
+        through = Recipe.tags.through.objects.filter(recipe=self.recipe)
+        kept = through.get(tag=self.tags[0]).pk
+        writes = self.patch(tags=[self.tags[0].pk, self.tags[2].pk])
+        self.assertEqual(
+            set(through.values_list('tag_id', flat=True)),
+            {self.tags[0].pk, self.tags[2].pk})
+        self.assertEqual(through.get(tag=self.tags[0]).pk, kept)
+        tag_writes = [sql for sql in writes if 'recipe_tags' in sql]
+        self.assertEqual(len(tag_writes), 2, tag_writes)
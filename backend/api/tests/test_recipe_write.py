@@ -0,0 +1,81 @@
+"""Проверка id ингредиентов и тегов при записи рецепта."""
+
+import base64
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import ApiTestCase, png_image
+from recipes.models import Recipe
+
+
+class RecipeWriteTests(ApiTestCase):
+    """id проверяются пачкой, ошибки остаются у своих элементов."""
+
+    def setUp(self):
+        """Справочники и автор."""
+        self.author = self.create_user('author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags = [self.create_tag(f'tag{index}')
+                         for index in range(3)]
+            self.ingredients = [self.create_ingredient(f'Ингредиент {index}')
+                                for index in range(30)]
+        self.client = self.client_for(self.author)
+        self.image = 'data:image/png;base64,' + base64.b64encode(
+            png_image().read()).decode()
+
+    def post(self, ingredient_ids, tag_ids):
+        """POST рецепта с количеством 1 у каждого ингредиента."""
+        return self.client.post('/api/recipes/', {
+            'name': 'Рецепт',
+            'text': 'Текст',
+            'cooking_time': 10,
+            'image': self.image,
+            'tags': tag_ids,
+            'ingredients': [
+                {'id': pk, 'amount': 1} for pk in ingredient_ids],
+        }, format='json')
+
+    def test_unknown_ingredients(self):
+        """Ошибка у каждого неизвестного ингредиента."""
+        response = self.post(
+            [self.ingredients[0].pk, 9998, self.ingredients[1].pk, 9999],
+            [self.tags[0].pk])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['ingredients']
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[2], {})
+        self.assertIn('9998', errors[1]['id'][0])
+        self.assertIn('9999', errors[3]['id'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_unknown_tag(self):
+        """Неизвестный тег называется в ошибке."""
+        response = self.post([self.ingredients[0].pk], [
+            self.tags[0].pk, 9999])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('9999', response.json()['tags'][0])
+
+    def test_not_a_number(self):
+        """id неверного типа — ошибка поля, а не 500."""
+        response = self.post(['abc'], ['abc'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.json())
+        self.assertIn('tags', response.json())
+
+    def test_queries_do_not_grow(self):
+        """Число запросов не зависит от числа ингредиентов и тегов.
+
+        Первый запрос еще проверяет токен в базе, поэтому сравниваются
+        повторные.
+        """
+        counts = []
+        for size in (2, 2, 30):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(
+                    [ingredient.pk for ingredient in self.ingredients[:size]],
+                    [tag.pk for tag in self.tags[:1 + size // 15]])
+            self.assertEqual(response.status_code, 201, response.content)
+            counts.append(len(queries))
+        self.assertEqual(counts[1], counts[2])
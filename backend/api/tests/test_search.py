@@ -0,0 +1,65 @@
+"""Полнотекстовый поиск рецептов."""
+
+from .base import ApiTestCase
+
+
+class SearchTests(ApiTestCase):
+    """Параметр search списка рецептов."""
+
+    def setUp(self):
+        """Рецепты с разными названиями и описаниями."""
+        self.author = self.create_user('author')
+        self.soup = self.create_recipe(self.author, 'Грибной суп')
+        self.salad = self.create_recipe(self.author, 'Салат')
+        self.salad.text = 'Подавать перед супом'
+        self.salad.save()
+        self.pie = self.create_recipe(self.author, 'Пирог с ёжевикой')
+        self.client = self.client_for()
+
+    def search(self, query, **params):
+        """Ответ на поиск в виде словаря."""
+        response = self.client.get(
+            '/api/recipes/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, query, **params):
+        """id найденных рецептов по порядку."""
+        return [
+            recipe['id'] for recipe in
+            self.search(query, **params)['results']]
+
+    def test_name_ranks_above_text(self):
+        """Совпадение в названии выше совпадения в описании."""
+        self.assertEqual(self.ids('суп'), [self.soup.id, self.salad.id])
+
+    def test_all_words_required(self):
+        """Рецепт должен содержать все слова запроса."""
+        self.assertEqual(self.ids('грибной суп'), [self.soup.id])
+        self.assertEqual(self.ids('грибной салат'), [])
+
+    def test_yo_matches_ye(self):
+        """ё и е не различаются."""
+        self.assertEqual(self.ids('ежевик'), [self.pie.id])
+
+    def test_query_without_words(self):
+        """Запрос без слов ничего не находит и не падает."""
+        for query in ('"', '!!', '«»'):
+            with self.subTest(query=query):
+                self.assertEqual(self.ids(query), [])
+                self.assertEqual(self.ids(query, cursor=''), [])
+
+    def test_search_with_cursor(self):
+        """Страницы поиска по курсору совпадают с полным результатом."""
+        for index in range(4):
+            self.create_recipe(self.author, f'Суп {index}')
+        expected = self.ids('суп', limit=10)
+        page = self.search('суп', cursor='', limit=2)
+        found = [recipe['id'] for recipe in page['results']]
+        while page['next']:
+            response = self.client.get(page['next'])
+            self.assertEqual(response.status_code, 200, response.content)
+            page = response.json()
+            found += [recipe['id'] for recipe in page['results']]
+        self.assertEqual(len(expected), 6)
+        self.assertEqual(found, expected)
@@ -0,0 +1,116 @@
+"""Сводный список покупок."""
+
+import json
+from io import StringIO
+
+from django.core.management import call_command
+
+from .base import ApiTestCase
+from recipes.models import ShoppingListItem
+
+
+class ShoppingListTests(ApiTestCase):
+    """Итоги списка покупок следуют за корзиной и составом рецептов."""
+
+    def setUp(self):
+        """Два рецепта с общим ингредиентом и покупатель."""
+        self.author = self.create_user('author')
+        self.buyer = self.create_user('buyer')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag = self.create_tag('dinner')
+            self.milk = self.create_ingredient('Молоко', 'мл')
+            self.flour = self.create_ingredient('Мука')
+            self.salt = self.create_ingredient('Соль')
+        self.pancakes = self.create_recipe(
+            self.author, 'Блины', [self.tag],
+            {self.milk: 500, self.flour: 200})
+        self.porridge = self.create_recipe(
+            self.author, 'Каша', [self.tag], {self.milk: 300})
+        self.client = self.client_for(self.buyer)
+
+    def totals(self, user=None):
+        """Итоги списка покупок пользователя по названиям."""
+        return dict(ShoppingListItem.objects.filter(
+            user=user or self.buyer,
+        ).values_list('ingredient__name', 'total_amount'))
+
+    def add(self, recipe):
+        """Рецепт в корзину."""
+        response = self.client.post(
+            f'/api/recipes/{recipe.pk}/shopping_cart/')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def remove(self, recipe):
+        """Рецепт из корзины."""
+        response = self.client.delete(
+            f'/api/recipes/{recipe.pk}/shopping_cart/')
+        self.assertEqual(response.status_code, 204, response.content)
+
+    def test_add_and_remove(self):
+        """Добавление складывает количества, удаление вычитает."""
+        self.add(self.pancakes)
+        self.add(self.porridge)
+        self.assertEqual(self.totals(), {'Молоко': 800, 'Мука': 200})
+        self.remove(self.pancakes)
+        self.assertEqual(self.totals(), {'Молоко': 300})
+        self.remove(self.porridge)
+        self.assertEqual(self.totals(), {})
+
+    def test_recipe_update(self):
+        """Правка состава рецепта меняет списки всех, у кого он в корзине."""
+        self.add(self.pancakes)
+        self.add(self.porridge)
+        other = self.create_user('other')
+        self.client_for(other).post(
+            f'/api/recipes/{self.pancakes.pk}/shopping_cart/')
+        response = self.client_for(self.author).patch(
+            f'/api/recipes/{self.pancakes.pk}/', {
+                'tags': [self.tag.pk],
+                'ingredients': [
+                    {'id': self.milk.pk, 'amount': 400},
+                    {'id': self.salt.pk, 'amount': 5},
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.totals(), {'Молоко': 700, 'Соль': 5})
+        self.assertEqual(self.totals(other), {'Молоко': 400, 'Соль': 5})
+
+    def test_recipe_delete(self):
+        """Удаление рецепта убирает его из списков покупок."""
+        self.add(self.pancakes)
+        self.add(self.porridge)
+        response = self.client_for(self.author).delete(
+            f'/api/recipes/{self.pancakes.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.totals(), {'Молоко': 300})
+
+    def test_drift_does_not_go_below_zero(self):
+        """Если итоги разошлись с корзиной, удаление не падает."""
+        self.add(self.pancakes)
+        ShoppingListItem.objects.filter(ingredient=self.milk).update(
+            total_amount=100)
+        self.remove(self.pancakes)
+        self.assertEqual(self.totals(), {})
+
+    def test_rebuild_command(self):
+        """Команда пересчета исправляет расхождения."""
+        self.add(self.pancakes)
+        self.add(self.porridge)
+        ShoppingListItem.objects.filter(ingredient=self.milk).update(
+            total_amount=1)
+        ShoppingListItem.objects.filter(ingredient=self.flour).delete()
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.assertEqual(self.totals(), {'Молоко': 800, 'Мука': 200})
+
+    def test_download(self):
+        """Файл списка покупок строится из итогов."""
+        self.add(self.pancakes)
+        self.add(self.porridge)
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content)), [
+                {'name': 'Молоко', 'measurement_unit': 'мл', 'amount': 800},
+                {'name': 'Мука', 'measurement_unit': 'г', 'amount': 200},
+            ])
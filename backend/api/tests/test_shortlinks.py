@@ -0,0 +1,65 @@
+"""Короткие ссылки на рецепты."""
+
+import base64
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import ApiTestCase
+from recipes import shortlinks
+
+
+class ShortLinkTests(ApiTestCase):
+    """Выдача короткой ссылки и редирект по ней."""
+
+    def setUp(self):
+        """Рецепт с новой версией списка рецептов."""
+        self.author = self.create_user('author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = self.create_recipe(self.author)
+        self.client = self.client_for()
+
+    def short_path(self):
+        """Путь короткой ссылки из get-link."""
+        response = self.client.get(f'/api/recipes/{self.recipe.pk}/get-link/')
+        self.assertEqual(response.status_code, 200, response.content)
+        link = response.json()['short-link']
+        self.assertTrue(link.startswith('http://testserver/s/'))
+        return link.removeprefix('http://testserver')
+
+    def test_redirect(self):
+        """Редирект на страницу рецепта без запросов к базе."""
+        path = self.short_path()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            response['Location'],
+            f'http://testserver/recipes/{self.recipe.pk}/')
+        self.assertEqual(len(queries), 0, [q['sql'] for q in queries])
+
+    def test_legacy_code(self):
+        """Старые коды base64 от id продолжают работать."""
+        code = base64.urlsafe_b64encode(
+            str(self.recipe.pk).encode()).decode()
+        response = self.client.get(f'/s/{code}/')
+        self.assertEqual(response.status_code, 302)
+
+    def test_forged_code(self):
+        """Подделанные и неизвестные коды отбрасываются."""
+        code = shortlinks.encode(self.recipe.pk)
+        forged = code[:-1] + ('A' if code[-1] != 'A' else 'B')
+        other_id = shortlinks.encode(self.recipe.pk + 1)
+        for code in (forged, other_id, 'garbage', 'z' + code[1:]):
+            with self.subTest(code=code):
+                self.assertEqual(
+                    self.client.get(f'/s/{code}/').status_code, 404)
+
+    def test_deleted_recipe(self):
+        """После удаления рецепта ссылка перестает работать."""
+        path = self.short_path()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertEqual(self.client.get(
+            f'/api/recipes/{self.recipe.pk}/get-link/').status_code, 404)
@@ -1,10 +1,8 @@
-import io
-
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import FileResponse
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.utils.http import urlsafe_base64_encode
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -12,42 +10,69 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 
-from .filters import IngredientFilter, RecipeFilter
+from .catalog import CatalogCacheMixin
+from .conditional import ConditionalGetMixin
+from .fastpath import FastReadMixin
+from .filters import RecipeFilter
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (AvatarchangeSerializer, FavoriteSerializer,
                           IngredientSerializer, ReadUserSerializer,
                           RecipeCreateUpdateSerializer, RecipeDetailSerializer,
                           RecipeForSubscrSerializer, ShoppingCartSerializer,
                           SubscriptionSerializer, SubscrUserSerializer,
-                          TagSerializer)
+                          TagSerializer, get_recipes_limit)
+from .shopping_list import CHUNK_ROWS, EXPORT_FORMATS, encoded_chunks
+from foodgram.settings import INGREDIENT_SEARCH_LIMIT
+from recipes import shortlinks
+from recipes.catalog import INGREDIENTS, TAGS, get_version
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
-                            Recipe, ShoppingCart, Tag)
+                            Recipe, ShoppingCart, ShoppingListItem, Tag)
+from recipes.search import ingredient_index
 from users.models import SubscrUser, User
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для ингредиентов (только чтение)."""
 
+    catalog_name = INGREDIENTS
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = IngredientFilter
     pagination_class = None
 
-
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    def list(self, request, *args, **kwargs):
+        """Поиск по названию отвечает из индекса без запросов к базе."""
+        name = request.query_params.get('name', '').strip()
+        if not name:
+            return super().list(request, *args, **kwargs)
+        try:
+            limit = int(request.query_params.get(
+                'limit', INGREDIENT_SEARCH_LIMIT))
+        except ValueError:
+            limit = INGREDIENT_SEARCH_LIMIT
+        limit = min(max(limit, 1), INGREDIENT_SEARCH_LIMIT)
+        return Response(ingredient_index.search(name, limit))
+
+
+class TagViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для тегов (только чтение)."""
 
+    catalog_name = TAGS
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class UserViewset(UserViewSet):
+class UserViewset(FastReadMixin, ConditionalGetMixin, UserViewSet):
     """ViewSet для работы с юзером."""
 
     queryset = User.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete',)
+    etag_fields = ('id', 'email', 'username', 'first_name', 'last_name',
+                   'avatar', 'is_subscribed')
+
+    def get_queryset(self):
+        """Пользователи с отметкой подписки текущего юзера."""
+        return super().get_queryset().with_subscription(self.request.user)
 
     @action(
         methods=['get'],
@@ -58,8 +83,8 @@ class UserViewset(UserViewSet):
     )
     def me(self, request):
         """Возвращает данные текущего юзера."""
-        serializer = ReadUserSerializer(
-            request.user, context={'request': request})
+        serializer = self.fast(ReadUserSerializer(
+            request.user, context={'request': request}))
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
@@ -100,13 +125,28 @@ class UserViewset(UserViewSet):
         """Возвращает список пользовательна кого подписан."""
         user = request.user
         authors = User.objects.filter(
-            authors__subscriber=user).prefetch_related(
-            'recipes__ingredients_amout__ingredient')
+            authors__subscriber=user).with_subscription(user)
         page = self.paginate_queryset(authors)
-        serializer = SubscrUserSerializer(
-            page, many=True, context={'request': request})
+        self.attach_latest_recipes(page, get_recipes_limit(request))
+        serializer = self.fast(SubscrUserSerializer(
+            page, many=True, context={'request': request}))
         return self.get_paginated_response(serializer.data)
 
+    def attach_latest_recipes(self, authors, limit):
+        """Краткие карточки рецептов для страницы авторов одним запросом."""
+        if limit is None:
+            prefetch_related_objects(authors, Prefetch(
+                'recipes',
+                queryset=Recipe.objects.only(
+                    'id', 'author_id', 'name', 'image', 'cooking_time'),
+                to_attr='latest_recipes'))
+            return
+        recipes = {author.id: [] for author in authors}
+        for recipe in Recipe.objects.latest_for_authors(recipes, limit):
+            recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = recipes[author.id]
+
     @action(detail=False, methods=['post'],
             url_path='(?P<pk>[^/.]+)/subscribe',
             permission_classes=[IsAuthenticated])
@@ -139,13 +179,48 @@ class UserViewset(UserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(FastReadMixin, ConditionalGetMixin,
+                    viewsets.ModelViewSet):
     """ViewSet для работы с рецептами."""
 
     queryset = Recipe.objects.all()
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
+    etag_fields = ('id', 'updated_at', 'is_favorited', 'is_in_shopping_cart',
+                   'author_is_subscribed', 'author__email',
+                   'author__username', 'author__first_name',
+                   'author__last_name', 'author__avatar')
+
+    def get_queryset(self):
+        """Рецепты с авторами, тегами, ингредиентами и отметками юзера.
+
+        Число запросов не зависит от размера страницы.
+        """
+        user = self.request.user
+        return (
+            Recipe.objects
+            .with_user_flags(user)
+            .prefetch_related(
+                Prefetch(
+                    'author',
+                    queryset=User.objects.with_subscription(user)),
+                'tags',
+                Prefetch(
+                    'ingredients_amout',
+                    queryset=IngredientRecipe.objects.select_related(
+                        'ingredient')),
+            )
+        )
+
+    def get_etag_queryset(self):
+        """Валидатор учитывает и подписку на автора рецепта."""
+        return super().get_etag_queryset().with_author_subscription(
+            self.request.user)
+
+    def get_etag_extra(self):
+        """Названия тегов и ингредиентов берутся из справочников."""
+        return get_version(INGREDIENTS), get_version(TAGS)
 
     def get_serializer_class(self):
         """Распределение сериализатора в зависимости от метода."""
@@ -153,34 +228,38 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeDetailSerializer
         return RecipeCreateUpdateSerializer
 
+    def perform_content_negotiation(self, request, force=False):
+        """У списка покупок параметр format задает формат файла."""
+        return super().perform_content_negotiation(
+            request,
+            force=force or self.action == 'download_shopping_cart')
+
     def generate_shopping_list_file(self, request):
-        """Генерация файла со списком покупок."""
+        """Потоковая генерация файла со списком покупок."""
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'format': 'Доступные форматы: '
+                           f'{", ".join(EXPORT_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        content_type, lines = EXPORT_FORMATS[file_format]
         ingredients_summary = (
-            IngredientRecipe.objects
-            .filter(recipe__shoppingcart__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total_amount=Sum('amount'))
+            ShoppingListItem.objects
+            .filter(user=request.user)
             .order_by('ingredient__name')
+            .values_list('ingredient__name', 'ingredient__measurement_unit',
+                         'total_amount')
         )
-
-        shopping_list_content = "Ваш список покупок:\n\n"
-        for ingredient in ingredients_summary:
-            name = ingredient['ingredient__name']
-            amount = ingredient['total_amount']
-            measurement_unit = ingredient['ingredient__measurement_unit']
-            shopping_list_content += (
-                f"• {name} — {amount} ({measurement_unit})\n"
-            )
-
-        shopping_list_bytes = shopping_list_content.encode('utf-8')
-        shopping_list_file = io.BytesIO(shopping_list_bytes)
-        response = FileResponse(
-            shopping_list_file, as_attachment=True, content_type='text/plain'
+        response = StreamingHttpResponse(
+            encoded_chunks(lines(
+                ingredients_summary.iterator(chunk_size=CHUNK_ROWS))),
+            content_type=content_type,
         )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping-list.txt"')
+            f'attachment; filename="shopping-list.{file_format}"')
         return response
 
+    @transaction.atomic
     def add_recipe_relation(self, request, pk, serializer_class):
         """Добавление записи в избранное или список покупок."""
         recipe = get_object_or_404(Recipe, pk=pk)
@@ -194,6 +273,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
+    @transaction.atomic
     def remove_recipe_relation(self, request, pk, model):
         """Удаление записи из избранного или списка покупок."""
         recipe = get_object_or_404(Recipe, pk=pk)
@@ -226,15 +306,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
-        """Генерация короткой ссылки для рецепта."""
-        recipe = self.get_object()
-        short_code = urlsafe_base64_encode(str(recipe.id).encode('utf-8'))
+        """Генерация короткой ссылки для рецепта без загрузки рецепта."""
+        if not (pk.isascii() and pk.isdigit()) or (
+                int(pk) not in shortlinks.recipe_ids):
+            raise Http404
+        short_code = shortlinks.encode(int(pk))
         short_path = f"/s/{short_code}/"
         short_link = request.build_absolute_uri(short_path)
         return Response({"short-link": short_link}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'],
-            url_path='download_shopping_cart')
+            url_path='download_shopping_cart',
+            permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
-        """Скачивание списка покупок в формате txt."""
+        """Скачивание списка покупок в формате txt, csv или json."""
         return self.generate_shopping_list_file(request)
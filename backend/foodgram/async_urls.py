@@ -0,0 +1,18 @@
+"""Обработка путей приложения под ASGI.
+
+Чтение рецептов, справочников и короткие ссылки обслуживают
+асинхронные views, остальные пути те же, что в foodgram.urls.
+"""
+
+from django.contrib import admin
+from django.urls import include, path
+
+from recipes.views import short_link_redirect
+
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+    path('s/<str:short_code>/', short_link_redirect,
+         name='short-link-redirect'),
+    path('admin/', admin.site.urls)
+
+]
@@ -0,0 +1,104 @@
+"""Постоянные соединения с базой: проверка, переподключение и метрики.
+
+Соединения живут CONN_MAX_AGE секунд и переиспользуются между
+запросами. Если соединение простаивало дольше DB_HEALTH_CHECK_IDLE
+секунд, в начале запроса оно проверяется, а мертвое закрывается:
+Django откроет новое при первом запросе к базе.
+
+Django закрывает соединения в close_old_connections еще до наших
+обработчиков request_finished, поэтому закрытия считаются в обертке
+close_if_unusable_or_obsolete каждого соединения: recycled — закрыто по
+CONN_MAX_AGE, broken — после ошибки оказалось нерабочим. unusable —
+простаивавшее соединение не прошло проверку. Счетчики ведутся
+отдельно в каждом процессе и раз в DB_METRICS_LOG_INTERVAL секунд
+пишутся в лог foodgram.db.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('foodgram.db')
+
+metrics = defaultdict(Counter)
+local = threading.local()
+last_logged = time.monotonic()
+
+
+def idle_since():
+    """Время окончания последнего запроса по каждой базе в этом потоке."""
+    if not hasattr(local, 'idle_since'):
+        local.idle_since = {}
+    return local.idle_since
+
+
+def snapshot():
+    """Копия счетчиков процесса по базам."""
+    return {alias: dict(counter) for alias, counter in metrics.items()}
+
+
+def track_closing(connection):
+    """Считаем соединения, которые Django закрывает между запросами."""
+    close_if_unusable_or_obsolete = connection.close_if_unusable_or_obsolete
+
+    def tracked():
+        was_open = connection.connection is not None
+        close_if_unusable_or_obsolete()
+        if was_open and connection.connection is None:
+            # Рабочее соединение Django помечает errors_occurred = False
+            # до проверки возраста, так что флаг остается только у
+            # нерабочих.
+            reason = 'broken' if connection.errors_occurred else 'recycled'
+            metrics[connection.alias][reason] += 1
+
+    tracked.tracks_closing = True
+    connection.close_if_unusable_or_obsolete = tracked
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Учитываем новое соединение."""
+    metrics[connection.alias]['opened'] += 1
+    if not getattr(connection.close_if_unusable_or_obsolete,
+                   'tracks_closing', False):
+        track_closing(connection)
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    """Проверяем соединения, которые долго простаивали."""
+    now = time.monotonic()
+    idle = idle_since()
+    for connection in connections.all():
+        alias = connection.alias
+        since = idle.pop(alias, None)
+        if connection.connection is None:
+            continue
+        metrics[alias]['reused'] += 1
+        if since is not None and now - since >= settings.DB_HEALTH_CHECK_IDLE:
+            metrics[alias]['health_checks'] += 1
+            if not connection.is_usable():
+                metrics[alias]['unusable'] += 1
+                connection.close()
+
+
+@receiver(request_finished)
+def remember_connections(sender, **kwargs):
+    """Запоминаем, какие соединения остались открытыми."""
+    global last_logged
+    now = time.monotonic()
+    idle = idle_since()
+    for connection in connections.all():
+        if connection.connection is not None:
+            idle[connection.alias] = now
+    if now - last_logged >= settings.DB_METRICS_LOG_INTERVAL:
+        last_logged = now
+        logger.info('pid %s: %s', os.getpid(), snapshot())
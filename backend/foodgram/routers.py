@@ -0,0 +1,42 @@
+"""Разделение запросов между основной базой и репликой для чтения.
+
+Запись всегда идет в основную базу, чтение — в реплику, кроме случаев,
+когда реплика может еще не знать о только что записанных данных:
+внутри транзакции, после записи в том же запросе или процессе и в
+течение REPLICA_PIN_SECONDS после записи тем же клиентом (см.
+api.middleware.ReplicaPinMiddleware). Таблицы, нужные для входа,
+всегда читаются из основной базы.
+"""
+
+from contextvars import ContextVar
+
+from django.db import connections
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+ALWAYS_PRIMARY = {('authtoken', 'token'), ('sessions', 'session')}
+
+pinned = ContextVar('db_pinned', default=False)
+written = ContextVar('db_written', default=False)
+
+
+class PrimaryReplicaRouter:
+    """Роутер баз основная/реплика с чтением своих записей."""
+
+    def db_for_read(self, model, **hints):
+        """Реплика, если в ней наверняка есть нужные данные."""
+        if (pinned.get() or written.get()
+                or connections[PRIMARY].in_atomic_block
+                or (model._meta.app_label,
+                    model._meta.model_name) in ALWAYS_PRIMARY):
+            return PRIMARY
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        """Запись только в основную базу, дальше читаем из нее же."""
+        written.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Обе базы содержат одни и те же данные."""
+        return True
@@ -11,6 +11,8 @@ USE_SQLITE = os.getenv('USE_SQLITE', 'True') == 'True'
 
 PAGINATION_LIMIT = 5
 
+INGREDIENT_SEARCH_LIMIT = 50
+
 SECRET_KEY = os.getenv('SECRET_KEY', get_random_secret_key()),
 
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
@@ -37,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,9 +47,16 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+# Под ASGI (foodgram/asgi.py) чтение рецептов и справочников идет через
+# асинхронные views, а их запросы к базе — через пул из ASYNC_DB_WORKERS
+# потоков.
+ASYNC_READS = os.getenv('ASYNC_READS', 'False') == 'True'
+ASYNC_DB_WORKERS = int(os.getenv('ASYNC_DB_WORKERS', 8))
+
+ROOT_URLCONF = 'foodgram.async_urls' if ASYNC_READS else 'foodgram.urls'
 
 TEMPLATES = [
     {
@@ -86,6 +96,49 @@ else:
         }
     }
 
+# Постоянные соединения: время жизни, проверка после простоя и период
+# записи счетчиков соединений процесса в лог.
+DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 60))
+DB_HEALTH_CHECK_IDLE = float(os.getenv('DB_HEALTH_CHECK_IDLE', 30))
+DB_METRICS_LOG_INTERVAL = int(os.getenv('DB_METRICS_LOG_INTERVAL', 300))
+
+# Реплика для чтения: на PostgreSQL задается хостом, на SQLite — путем
+# к копии базы (например, для проверки маршрутизации локально).
+if USE_SQLITE and os.getenv('SQLITE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('SQLITE_REPLICA_NAME'),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+elif not USE_SQLITE and os.getenv('REPLICA_DB_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('REPLICA_DB_HOST'),
+        'PORT': os.getenv('REPLICA_DB_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = (
+    ['foodgram.routers.PrimaryReplicaRouter']
+    if 'replica' in DATABASES else []
+)
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/foodgram-cache'),
+    }
+}
+
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', 1024))
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 30))
+AUTH_CACHE_SHARED = os.getenv('AUTH_CACHE_SHARED', 'False') == 'True'
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -123,6 +176,18 @@ STATIC_ROOT = BASE_DIR / 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media/'
 
+MAX_UPLOAD_IMAGE_SIZE = int(
+    os.getenv('MAX_UPLOAD_IMAGE_SIZE', 5 * 1024 * 1024))
+
+IMAGE_VARIANTS = {
+    'small': 320,
+    'medium': 960,
+}
+
+IMAGE_WEBP_QUALITY = 80
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -132,12 +197,52 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.paginations.ProjectPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 
+QUERY_INSPECT_HEADERS = os.getenv('QUERY_INSPECT_HEADERS', 'False') == 'True'
+
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 20))
+
+QUERY_BUDGETS = {
+    'api:recipes-list': 8,
+    'api:recipes-detail': 8,
+    'api:recipes-download-shopping-cart': 4,
+    'api:users-list': 6,
+    'api:users-detail': 6,
+    'api:users-me': 4,
+    'api:users-subscriptions': 10,
+    'api:ingredients-list': 4,
+    'api:tags-list': 4,
+    'POST api:recipes-list': 14,
+    'PATCH api:recipes-detail': 20,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'foodgram.queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'foodgram.db': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 DJOSER = {
     'HIDE_USERS': False,
     'LOGIN_FIELD': 'email',
@@ -0,0 +1,36 @@
+"""Пул потоков для блокирующей работы асинхронных views.
+
+ORM Django синхронный, поэтому асинхронные views выполняют запросы к
+базе в пуле из ASYNC_DB_WORKERS потоков. Размер пула ограничивает и
+число одновременных соединений процесса с базой. Задача выполняется в
+копии контекста вызвавшего ее запроса, так что привязка к основной
+базе и учет запросов работают и в потоках пула.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_WORKERS, thread_name_prefix='foodgram-db')
+
+
+def call(func, args, kwargs):
+    """Вызов в потоке пула со сбросом устаревших соединений.
+
+    Сигналы начала и конца запроса потоки пула не получают, поэтому
+    соединения с ошибками или старше CONN_MAX_AGE закрываются здесь.
+    """
+    close_old_connections()
+    return func(*args, **kwargs)
+
+
+async def run(func, *args, **kwargs):
+    """Выполняем func в пуле и ждем результат, не блокируя цикл событий."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(context.run, call, func, args, kwargs))
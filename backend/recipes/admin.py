@@ -1,12 +1,20 @@
 """Работа с моделями в админке."""
 
 from django.contrib import admin
+from django.utils import timezone
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
 
+from . import shopping
 from .models import FavoriteRecipe, Ingredient, IngredientRecipe, Recipe, Tag
 
 
+def touch_recipes(recipe_ids):
+    """Отмечаем изменение рецептов, ингредиенты которых правили отдельно."""
+    Recipe.objects.filter(pk__in=set(recipe_ids)).update(
+        updated_at=timezone.now())
+
+
 class IngredientRecipeinAdmin(admin.StackedInline):
     """Количество ингредиентов в рецепте."""
 
@@ -33,10 +41,14 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('tags',)
     search_fields = ('author__first_name', 'author__last_name', 'name')
 
-    @admin.display(description='Количество добавлений в избранное')
-    def favorites_count(self, obj):
-        """Функция для получения количества добавлений в избранное."""
-        return obj.favoriterecipe.count()
+    def save_related(self, request, form, formsets, change):
+        """Пересчитываем списки покупок после изменения ингредиентов."""
+        shopping.lock_recipe(form.instance.pk)
+        old_amounts = shopping.recipe_amounts(form.instance.pk)
+        super().save_related(request, form, formsets, change)
+        shopping.recipe_changed(
+            form.instance.pk, old_amounts,
+            shopping.recipe_amounts(form.instance.pk))
 
     @admin.display(description='Теги')
     def tags_in_list(self, obj):
@@ -62,6 +74,31 @@ class IngredientRecipeAdmin(admin.ModelAdmin):
 
     list_display = ('id', 'recipe', 'ingredient', 'amount',)
 
+    def save_model(self, request, obj, form, change):
+        """Пересчитываем списки покупок с этим рецептом."""
+        changed = {(obj.recipe_id, obj.ingredient_id)}
+        if change:
+            changed.add(
+                (form.initial['recipe'], form.initial['ingredient']))
+        super().save_model(request, obj, form, change)
+        for recipe_id, ingredient_id in changed:
+            shopping.refresh_recipe(recipe_id, {ingredient_id})
+        touch_recipes(recipe_id for recipe_id, _ in changed)
+
+    def delete_model(self, request, obj):
+        """Пересчитываем списки покупок с этим рецептом."""
+        super().delete_model(request, obj)
+        shopping.refresh_recipe(obj.recipe_id, {obj.ingredient_id})
+        touch_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        """Пересчитываем списки покупок после массового удаления."""
+        removed = list(queryset.values_list('recipe_id', 'ingredient_id'))
+        super().delete_queryset(request, queryset)
+        for recipe_id, ingredient_id in removed:
+            shopping.refresh_recipe(recipe_id, {ingredient_id})
+        touch_recipes(recipe_id for recipe_id, _ in removed)
+
 
 @admin.register(FavoriteRecipe)
 class FavoriteRecipeAdmin(admin.ModelAdmin):
@@ -9,3 +9,7 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты, ингредиенты и теги'
+
+    def ready(self):
+        """Подключаем обработчики сигналов."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,61 @@
+"""Помощники для потоковой загрузки и выгрузки больших объемов данных."""
+
+import json
+from itertools import islice
+
+READ_SIZE = 64 * 1024
+
+
+def chunks(iterable, size):
+    """Делим последовательность на части по size элементов."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_json_array(file, read_size=READ_SIZE):
+    """Элементы JSON-массива из файла без чтения его целиком.
+
+    Файл читается кусками, из буфера по одному разбираются элементы,
+    поэтому в памяти держится только текущий кусок.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Пропускаем пробелы и разделители между элементами.
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise ValueError('Ожидался JSON-массив.')
+            started = True
+            position += 1
+            continue
+        if started and buffer[position:position + 1] == ']':
+            return
+        try:
+            if position >= len(buffer):
+                raise ValueError
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                if not buffer[position:].strip():
+                    return
+                raise
+            chunk = file.read(read_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        # Число на границе куска могло прочитаться не полностью.
+        if end == len(buffer) and not eof:
+            chunk = file.read(read_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
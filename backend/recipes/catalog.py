@@ -0,0 +1,58 @@
+"""Версии справочников ингредиентов, тегов и списка рецептов.
+
+Версия хранится в общем кэше, поэтому изменение справочника в одном
+процессе становится видно всем остальным без запросов к базе.
+"""
+
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+INGREDIENTS = 'ingredients'
+TAGS = 'tags'
+RECIPES = 'recipes'
+
+
+def version_key(name):
+    """Ключ версии справочника в кэше."""
+    return f'catalog:{name}:version'
+
+
+def get_version(name):
+    """Текущая версия справочника."""
+    version = cache.get(version_key(name))
+    if version is None:
+        cache.add(version_key(name), uuid4().hex, None)
+        version = cache.get(version_key(name))
+    return version
+
+
+def bump_version(name):
+    """Новая версия справочника после фиксации транзакции.
+
+    Версия случайная, а не счетчик: после очистки кэша процессы
+    не примут старые данные за актуальные.
+    """
+    transaction.on_commit(
+        lambda: cache.set(version_key(name), uuid4().hex, None))
+
+
+class CatalogMap:
+    """Словарь из справочника в памяти процесса.
+
+    Перестраивается функцией build, когда меняется версия справочника.
+    """
+
+    def __init__(self, name, build):
+        """Пустой словарь справочника name."""
+        self.name = name
+        self.build = build
+        self._state = (None, None)
+
+    def get(self):
+        """Актуальный словарь."""
+        version = get_version(self.name)
+        if self._state[0] != version or self._state[1] is None:
+            self._state = (version, self.build())
+        return self._state[1]
@@ -0,0 +1,42 @@
+"""Счетчики избранного, рецептов и подписчиков."""
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import FavoriteRecipe, Recipe, User
+from users.models import SubscrUser
+
+
+def change_counter(queryset, field, delta):
+    """Атомарно меняем счетчик в базе, не опускаясь ниже нуля."""
+    queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def count_subquery(model, field):
+    """Подзапрос с числом строк model, ссылающихся на объект."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', SubscrUser, 'author'),
+)
+
+
+def reconcile():
+    """Пересчитываем все счетчики и возвращаем число исправленных строк."""
+    fixed = {}
+    for model, field, related_model, related_field in COUNTERS:
+        actual = count_subquery(related_model, related_field)
+        fixed[f'{model._meta.model_name}.{field}'] = (
+            model.objects.annotate(actual=actual)
+            .exclude(**{field: F('actual')})
+            .update(**{field: actual})
+        )
+    return fixed
@@ -0,0 +1,120 @@
+"""Полнотекстовый поиск рецептов по названию и описанию.
+
+На PostgreSQL у таблицы рецептов есть генерируемая колонка tsvector
+с русской морфологией (название весит больше описания) и GIN-индекс
+по ней, база сама поддерживает ее в актуальном состоянии. На SQLite
+используется таблица FTS5, которую синхронизируют триггеры; русской
+морфологии там нет, поэтому слова ищутся по префиксу, а ё заменяется
+на е.
+
+Миграции в проекте создаются при развертывании, так что структуры
+создаются после migrate обработчиком post_migrate.
+"""
+
+import re
+
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+TABLE = 'recipes_recipe'
+FTS_TABLE = 'recipes_recipe_fts'
+SEARCH_CONFIG = 'russian'
+WORD_RE = re.compile(r'\w+')
+
+
+POSTGRES_SETUP = (
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') "
+    f"|| setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')"
+    f") STORED",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_search_gin "
+    f"ON {TABLE} USING gin (search_vector)",
+)
+SQLITE_COLUMN = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+SQLITE_VALUES = (
+    f"new.id, {SQLITE_COLUMN.format('new.name')}, "
+    f"{SQLITE_COLUMN.format('new.text')}"
+)
+SQLITE_SETUP = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, text, tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {TABLE} "
+    f"BEGIN INSERT INTO {FTS_TABLE} (rowid, name, text) "
+    f"VALUES ({SQLITE_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {TABLE} "
+    f"BEGIN DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+    f"AFTER UPDATE OF name, text ON {TABLE} "
+    f"BEGIN DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+    f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+    f"VALUES ({SQLITE_VALUES}); END",
+    # SQLite пересоздает таблицу при изменении схемы и теряет триггеры,
+    # поэтому после каждой миграции индекс заполняется заново.
+    f"DELETE FROM {FTS_TABLE}",
+    f"INSERT INTO {FTS_TABLE} (rowid, name, text) SELECT "
+    f"{SQLITE_VALUES.replace('new.', '')} FROM {TABLE}",
+)
+
+
+def normalize(text):
+    """Приводим ё к е, как в индексе SQLite."""
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def install(connection):
+    """Создаем структуры полнотекстового поиска для базы connection."""
+    statements = {
+        'postgresql': POSTGRES_SETUP,
+        'sqlite': SQLITE_SETUP,
+    }.get(connection.vendor, ())
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def fts5_query(query):
+    """Запрос FTS5 из пользовательской строки: все слова по префиксу."""
+    return ' '.join(
+        f'"{word}"*' for word in WORD_RE.findall(normalize(query)))
+
+
+def search(queryset, query, vendor):
+    """Рецепты, подходящие под query, с оценкой релевантности search_rank.
+
+    search_rank участвует в сортировке, а значит, и в курсоре пагинации,
+    который сравнивает ее со значением из JSON. Поэтому оценка везде
+    double precision: ts_rank возвращает real, и без приведения равенство
+    с числом из курсора не выполняется.
+    """
+    if vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.annotate(
+            search_match=RawSQL(
+                f'"{TABLE}"."search_vector" @@ {tsquery}', (query,),
+                output_field=BooleanField()),
+            search_rank=RawSQL(
+                f'ts_rank("{TABLE}"."search_vector", {tsquery})'
+                f'::double precision', (query,),
+                output_field=FloatField()),
+        ).filter(search_match=True)
+    if vendor == 'sqlite':
+        match = fts5_query(query)
+        if not match:
+            # В запросе нет слов. Оценка нужна для сортировки в search.
+            return queryset.annotate(
+                search_rank=Value(0.0, output_field=FloatField())).none()
+        # Таблица FTS5 присоединяется один раз, bm25 считается по строке
+        # соединения, а не отдельным подзапросом для каждого рецепта.
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'"{FTS_TABLE}"."rowid" = "{TABLE}"."id"',
+                   f'"{FTS_TABLE}" MATCH %s'],
+            params=[match],
+        ).annotate(search_rank=RawSQL(
+            f'-bm25("{FTS_TABLE}", 10.0, 1.0)', (),
+            output_field=FloatField()))
+    for word in WORD_RE.findall(query):
+        queryset = queryset.filter(name__icontains=word)
+    return queryset.annotate(
+        search_rank=Value(0.0, output_field=FloatField()))
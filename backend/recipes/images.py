@@ -0,0 +1,91 @@
+"""Фоновая обработка загруженных изображений.
+
+Для картинок рецептов и аватаров строятся уменьшенные копии в WebP.
+Обработка идет в пуле потоков процесса после фиксации транзакции,
+поэтому запрос не ждет ресайза. Копии лежат в том же хранилище, что и
+оригинал, в соседнем каталоге variants. Имена копий вычисляются из имени
+оригинала и отдаются в api сразу, без проверки файлов. Пока копии нет,
+nginx по ее адресу перенаправляет на оригинал, имя которого входит в
+имя копии.
+"""
+
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .storage import VARIANTS_DIR
+
+logger = logging.getLogger('foodgram.images')
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS, thread_name_prefix='images')
+
+
+def variant_name(name, variant):
+    """Имя файла уменьшенной копии: <оригинал>.<размер>.webp."""
+    path = PurePosixPath(name)
+    return str(path.parent / VARIANTS_DIR / f'{path.name}.{variant}.webp')
+
+
+def missing_variants(storage, name):
+    """Копии, которых еще нет в хранилище."""
+    return [
+        variant for variant in settings.IMAGE_VARIANTS
+        if not storage.exists(variant_name(name, variant))
+    ]
+
+
+def delete_variants(storage, name):
+    """Удаление всех копий изображения."""
+    for variant in settings.IMAGE_VARIANTS:
+        storage.delete(variant_name(name, variant))
+
+
+def variant_urls(image):
+    """Адреса копий, в том числе еще не готовых."""
+    return {
+        variant: image.storage.url(variant_name(image.name, variant))
+        for variant in settings.IMAGE_VARIANTS
+    }
+
+
+def make_variants(storage, name):
+    """Строим недостающие копии изображения."""
+    missing = missing_variants(storage, name)
+    if not missing:
+        return
+    with storage.open(name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert(
+                'RGBA' if 'transparency' in image.info else 'RGB')
+        for variant in missing:
+            size = settings.IMAGE_VARIANTS[variant]
+            copy = image.copy()
+            copy.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            copy.save(buffer, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY)
+            storage.save(
+                variant_name(name, variant), ContentFile(buffer.getvalue()))
+
+
+def process(storage, name):
+    """Обработка в пуле с записью ошибок в лог."""
+    try:
+        make_variants(storage, name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+
+
+def schedule(image):
+    """Ставим изображение в очередь после фиксации транзакции."""
+    if image and missing_variants(image.storage, image.name):
+        storage, name = image.storage, image.name
+        transaction.on_commit(
+            lambda: executor.submit(process, storage, name))
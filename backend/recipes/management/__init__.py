@@ -0,0 +1 @@
+"""Объязательный файл."""
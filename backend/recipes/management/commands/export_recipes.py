@@ -0,0 +1,79 @@
+"""Потоковая выгрузка рецептов в NDJSON."""
+
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import IngredientRecipe, Recipe
+
+
+class Command(BaseCommand):
+    """Выгружает рецепты по одному JSON-объекту на строку.
+
+    Рецепты читаются пачками по id, к каждой пачке отдельными запросами
+    подгружаются теги и ингредиенты, поэтому память не растет с числом
+    рецептов. Автор, теги и ингредиенты записываются натуральными
+    ключами, картинка — именем файла в хранилище.
+    """
+
+    help = 'Выгружает рецепты с тегами и ингредиентами в NDJSON.'
+
+    def add_arguments(self, parser):
+        """Параметры команды."""
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки, по умолчанию stdout.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, path, batch_size, **options):
+        """Выгрузка."""
+        file = (self.stdout if path == '-'
+                else open(path, 'w', encoding='utf-8'))
+        exported = 0
+        try:
+            for line in self.lines(batch_size):
+                file.write(line)
+                exported += 1
+        finally:
+            if file is not self.stdout:
+                file.close()
+        self.stderr.write(f'Выгружено рецептов: {exported}')
+
+    def lines(self, batch_size):
+        """Строки NDJSON, по пачке рецептов за раз."""
+        last_id = 0
+        while True:
+            recipes = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id')
+                .values('id', 'name', 'text', 'cooking_time', 'image',
+                        'created_at', 'author__email')[:batch_size])
+            if not recipes:
+                return
+            last_id = recipes[-1]['id']
+            ids = [recipe['id'] for recipe in recipes]
+            tags = defaultdict(list)
+            for recipe_id, slug in (
+                    Recipe.tags.through.objects.filter(recipe_id__in=ids)
+                    .order_by('tag__slug')
+                    .values_list('recipe_id', 'tag__slug')):
+                tags[recipe_id].append(slug)
+            ingredients = defaultdict(list)
+            for recipe_id, name, unit, amount in (
+                    IngredientRecipe.objects.filter(recipe_id__in=ids)
+                    .order_by('id')
+                    .values_list('recipe_id', 'ingredient__name',
+                                 'ingredient__measurement_unit', 'amount')):
+                ingredients[recipe_id].append({
+                    'name': name, 'measurement_unit': unit, 'amount': amount})
+            for recipe in recipes:
+                yield json.dumps({
+                    'name': recipe['name'],
+                    'text': recipe['text'],
+                    'cooking_time': recipe['cooking_time'],
+                    'image': recipe['image'],
+                    'created_at': recipe['created_at'].isoformat(),
+                    'author': recipe['author__email'],
+                    'tags': tags[recipe['id']],
+                    'ingredients': ingredients[recipe['id']],
+                }, ensure_ascii=False) + '\n'
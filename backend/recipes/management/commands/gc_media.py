@@ -0,0 +1,69 @@
+"""Удаление медиафайлов, на которые не ссылается ни один объект."""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import images
+from recipes.models import Recipe, User
+from recipes.storage import (content_storage, is_referenced, references,
+                             stored_files)
+
+
+class Command(BaseCommand):
+    """Сборка мусора в хранилище картинок и аватаров."""
+
+    help = ('Удаляет файлы картинок рецептов и аватаров без ссылок из базы '
+            'вместе с их уменьшенными копиями.')
+
+    def add_arguments(self, parser):
+        """Параметры команды."""
+        parser.add_argument(
+            '--grace', type=int, default=60,
+            help='Не трогать файлы моложе указанного числа минут '
+                 '(их транзакция могла еще не завершиться).')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.')
+
+    def handle(self, *args, grace, dry_run, **options):
+        """Сборка мусора."""
+        threshold = time.time() - grace * 60
+        refs = references()
+        directories = (
+            Recipe._meta.get_field('image').upload_to,
+            User._meta.get_field('avatar').upload_to,
+        )
+        kept = removed = 0
+        for directory in directories:
+            if not content_storage.exists(directory):
+                continue
+            for name, mtime in stored_files(directory):
+                if refs[name] or mtime > threshold:
+                    kept += 1
+                    continue
+                if dry_run:
+                    removed += 1
+                    self.stdout.write(name)
+                    continue
+                if self.reused(name, threshold):
+                    kept += 1
+                    continue
+                removed += 1
+                content_storage.delete_orphan(name)
+                images.delete_variants(content_storage, name)
+        action = 'К удалению' if dry_run else 'Удалено'
+        self.stdout.write(f'Оставлено файлов: {kept}, {action}: {removed}')
+
+    @staticmethod
+    def reused(name, threshold):
+        """Файл снова нужен после снимка ссылок.
+
+        Пока шел обход, новая загрузка могла сослаться на этот файл или
+        обновить время его изменения, поэтому проверяем прямо перед
+        удалением.
+        """
+        return (
+            os.path.getmtime(content_storage.path(name)) > threshold
+            or is_referenced(name))
@@ -0,0 +1,161 @@
+"""Пакетная загрузка рецептов из NDJSON."""
+
+import json
+import sys
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from recipes.bulk import chunks
+from recipes.catalog import RECIPES, bump_version
+from recipes.constants import (LENGTH_RECIPE_NAME, MAX_LIMIT_AMOUNT,
+                               MAX_LIMIT_COOK_TIME, MIN_LIMIT_AMOUNT,
+                               MIN_LIMIT_COOK_TIME)
+from recipes.counters import change_counter
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag, User
+
+
+class Command(BaseCommand):
+    """Загружает рецепты, выгруженные командой export_recipes.
+
+    Теги и ингредиенты ищутся по натуральным ключам в словарях, которые
+    строятся одним запросом на справочник, авторы — одним запросом на
+    пачку. Рецепты, их теги и ингредиенты пишутся через bulk_create,
+    каждая пачка в своей транзакции. Рецепты с неизвестными авторами,
+    тегами, ингредиентами или неверными полями пропускаются.
+    """
+
+    help = 'Загружает рецепты с тегами и ингредиентами из NDJSON.'
+
+    def add_arguments(self, parser):
+        """Параметры команды."""
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для загрузки, по умолчанию stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, path, batch_size, **options):
+        """Загрузка."""
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        }
+        self.skipped = Counter()
+        imported = 0
+        started = time.monotonic()
+        file = (sys.stdin if path == '-'
+                else open(path, encoding='utf-8'))
+        try:
+            for batch in chunks(self.read(file), batch_size):
+                imported += self.import_batch(batch)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        if imported:
+            bump_version(RECIPES)
+        elapsed = time.monotonic() - started
+        skipped = ', '.join(
+            f'{reason}: {number}' for reason, number in self.skipped.items())
+        self.stdout.write(
+            f'Загружено рецептов: {imported}, пропущено: '
+            f'{sum(self.skipped.values())}{f" ({skipped})" if skipped else ""}'
+            f', {elapsed:.2f} с ({imported / max(elapsed, 1e-6):.0f} '
+            'рецептов/с)')
+
+    def read(self, file):
+        """Объекты из непустых строк файла."""
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise CommandError(f'Строка {number}: неверный JSON: {error}')
+
+    def parse(self, item, authors):
+        """Рецепт с id тегов и ингредиентов или причина пропуска."""
+        try:
+            author_id = authors.get(item['author'])
+            if author_id is None:
+                return 'неизвестный автор'
+            name, text = item['name'], item['text']
+            if (not isinstance(name, str) or not isinstance(text, str)
+                    or not name or len(name) > LENGTH_RECIPE_NAME):
+                return 'неверное название или описание'
+            cooking_time = int(item['cooking_time'])
+            if not MIN_LIMIT_COOK_TIME <= cooking_time <= MAX_LIMIT_COOK_TIME:
+                return 'неверное время приготовления'
+            tag_ids = {self.tags.get(slug) for slug in item['tags']}
+            if None in tag_ids or not tag_ids:
+                return 'неизвестный тег'
+            amounts = {}
+            for ingredient in item['ingredients']:
+                ingredient_id = self.ingredients.get(
+                    (ingredient['name'], ingredient['measurement_unit']))
+                if ingredient_id is None:
+                    return 'неизвестный ингредиент'
+                amount = int(ingredient['amount'])
+                if not MIN_LIMIT_AMOUNT <= amount <= MAX_LIMIT_AMOUNT:
+                    return 'неверное количество'
+                amounts.setdefault(ingredient_id, amount)
+            if not amounts:
+                return 'нет ингредиентов'
+            recipe = Recipe(
+                name=name, text=text, cooking_time=cooking_time,
+                image=item['image'], author_id=author_id)
+            if item.get('created_at'):
+                recipe.created_at = parse_datetime(item['created_at'])
+                if recipe.created_at is None:
+                    return 'неверная дата'
+        except (KeyError, TypeError, ValueError):
+            return 'неверная запись'
+        return recipe, tag_ids, amounts
+
+    def import_batch(self, batch):
+        """Пачка рецептов с тегами и ингредиентами в одной транзакции."""
+        authors = dict(User.objects.filter(
+            email__in={item.get('author') for item in batch
+                       if isinstance(item, dict)}
+        ).values_list('email', 'id'))
+        parsed = []
+        for item in batch:
+            result = (self.parse(item, authors) if isinstance(item, dict)
+                      else 'неверная запись')
+            if isinstance(result, str):
+                self.skipped[result] += 1
+            else:
+                parsed.append(result)
+        if not parsed:
+            return 0
+        with transaction.atomic():
+            last_id = Recipe.objects.order_by('-id').values_list(
+                'id', flat=True).first() or 0
+            recipes = Recipe.objects.bulk_create(
+                [recipe for recipe, _, _ in parsed])
+            if recipes[0].pk is None:
+                # Бэкенд не вернул id после вставки, берем их по порядку.
+                for recipe, pk in zip(recipes, Recipe.objects.filter(
+                        id__gt=last_id).order_by('id').values_list(
+                            'id', flat=True)):
+                    recipe.pk = pk
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, tag_ids, _ in parsed for tag_id in tag_ids)
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    recipe_id=recipe.pk, ingredient_id=ingredient_id,
+                    amount=amount)
+                for recipe, _, amounts in parsed
+                for ingredient_id, amount in amounts.items())
+            per_author = Counter(recipe.author_id for recipe in recipes)
+            by_delta = {}
+            for author_id, delta in per_author.items():
+                by_delta.setdefault(delta, []).append(author_id)
+            for delta, author_ids in by_delta.items():
+                change_counter(User.objects.filter(pk__in=author_ids),
+                               'recipes_count', delta)
+        return len(recipes)
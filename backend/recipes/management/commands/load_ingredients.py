@@ -0,0 +1,137 @@
+"""Быстрая загрузка справочника ингредиентов из CSV или JSON."""
+
+import csv
+import io
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.bulk import chunks, iter_json_array
+from recipes.catalog import INGREDIENTS, bump_version
+from recipes.constants import (LENGTH_INGREDIENT_MEAS_UNIT,
+                               LENGTH_INGREDIENT_NAME)
+from recipes.models import Ingredient
+
+DEFAULT_FILE = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+FORMATS = ('csv', 'json')
+
+
+class Command(BaseCommand):
+    """Потоковая загрузка ингредиентов пачками.
+
+    Повторы по (name, measurement_unit) отбрасываются и в файле, и
+    относительно базы, поэтому повторный запуск ничего не меняет.
+    """
+
+    help = ('Загружает ингредиенты из CSV (название, единица) или '
+            'JSON-массива объектов с полями name и measurement_unit.')
+
+    def add_arguments(self, parser):
+        """Параметры команды."""
+        parser.add_argument('path', nargs='?', default=DEFAULT_FILE)
+        parser.add_argument(
+            '--format', choices=FORMATS, default=None,
+            help='Формат файла, по умолчанию — по расширению.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, path, format, batch_size, **options):
+        """Загрузка."""
+        path = Path(path)
+        format = format or path.suffix.lstrip('.').lower()
+        if format not in FORMATS:
+            raise CommandError(
+                f'Неизвестный формат файла: {path.name}, укажите --format.')
+        write = (self.copy_batch if connection.vendor == 'postgresql'
+                 else self.insert_batch)
+        self.read = self.skipped = self.duplicates = 0
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = self.unique(self.clean(
+                self.read_csv(file) if format == 'csv'
+                else self.read_json(file)))
+            for batch in chunks(rows, batch_size):
+                with transaction.atomic():
+                    write(batch)
+        added = Ingredient.objects.count() - before
+        if added:
+            bump_version(INGREDIENTS)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Прочитано строк: {self.read}, добавлено: {added}, '
+            f'повторов: {self.duplicates}, пропущено: {self.skipped}, '
+            f'{elapsed:.2f} с ({self.read / max(elapsed, 1e-6):.0f} строк/с)')
+
+    def read_csv(self, file):
+        """Строки CSV: название и единица измерения."""
+        for row in csv.reader(file):
+            if len(row) != 2:
+                self.read += 1
+                self.skipped += 1
+                continue
+            yield row
+
+    def read_json(self, file):
+        """Объекты JSON-массива."""
+        try:
+            for item in iter_json_array(file):
+                if not isinstance(item, dict):
+                    self.read += 1
+                    self.skipped += 1
+                    continue
+                yield item.get('name'), item.get('measurement_unit')
+        except ValueError as error:
+            raise CommandError(f'Неверный JSON: {error}')
+
+    def clean(self, rows):
+        """Обрезаем пробелы и отбрасываем неверные строки."""
+        for name, unit in rows:
+            self.read += 1
+            if not isinstance(name, str) or not isinstance(unit, str):
+                self.skipped += 1
+                continue
+            name, unit = name.strip(), unit.strip()
+            if (not name or not unit
+                    or len(name) > LENGTH_INGREDIENT_NAME
+                    or len(unit) > LENGTH_INGREDIENT_MEAS_UNIT):
+                self.skipped += 1
+                continue
+            yield name, unit
+
+    def unique(self, rows):
+        """Отбрасываем повторы внутри файла."""
+        seen = set()
+        for key in rows:
+            if key in seen:
+                self.duplicates += 1
+                continue
+            seen.add(key)
+            yield key
+
+    def insert_batch(self, batch):
+        """Пачка одним INSERT с пропуском уже существующих строк."""
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=unit)
+             for name, unit in batch),
+            batch_size=len(batch), ignore_conflicts=True)
+
+    def copy_batch(self, batch):
+        """Пачка через COPY во временную таблицу и INSERT ON CONFLICT."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_load '
+                '(name text, measurement_unit text) ON COMMIT DROP')
+            cursor.cursor.copy_expert(
+                'COPY ingredient_load (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)', buffer)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT name, measurement_unit FROM ingredient_load '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING')
@@ -0,0 +1,32 @@
+"""Построение уменьшенных копий для уже загруженных изображений."""
+
+from django.core.management.base import BaseCommand
+
+from recipes import images
+from recipes.models import Recipe, User
+
+
+class Command(BaseCommand):
+    """Синхронно строит недостающие копии картинок и аватаров."""
+
+    help = ('Строит недостающие уменьшенные копии в WebP для картинок '
+            'рецептов и аватаров пользователей.')
+
+    def handle(self, *args, **options):
+        """Обработка."""
+        recipe_storage = Recipe._meta.get_field('image').storage
+        avatar_storage = User._meta.get_field('avatar').storage
+        names = [
+            *((recipe_storage, name) for name in Recipe.objects.exclude(
+                image='').values_list('image', flat=True)),
+            *((avatar_storage, name) for name in User.objects.exclude(
+                avatar='').exclude(avatar__isnull=True)
+                .values_list('avatar', flat=True)),
+        ]
+        processed = 0
+        for storage, name in names:
+            if images.missing_variants(storage, name):
+                images.process(storage, name)
+                processed += 1
+        self.stdout.write(
+            f'Изображений: {len(names)}, обработано: {processed}')
@@ -0,0 +1,28 @@
+"""Пересчет сводных списков покупок по корзинам."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import shopping
+
+
+class Command(BaseCommand):
+    """Исправляет расхождения списков покупок с корзинами."""
+
+    help = ('Пересчитывает сводные списки покупок по корзинам '
+            'всех или указанных пользователей.')
+
+    def add_arguments(self, parser):
+        """Параметры команды."""
+        parser.add_argument('--user', type=int, action='append',
+                            dest='user_ids',
+                            help='id пользователя, можно указать несколько.')
+
+    def handle(self, *args, **options):
+        """Пересчет."""
+        started = time.perf_counter()
+        created = shopping.rebuild(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк в списках покупок: {created}, '
+            f'{time.perf_counter() - started:.1f} с.'))
@@ -0,0 +1,17 @@
+"""Сверка счетчиков избранного, рецептов и подписчиков."""
+
+from django.core.management.base import BaseCommand
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    """Исправляет расхождения счетчиков с данными."""
+
+    help = ('Пересчитывает счетчики избранного у рецептов, рецептов и '
+            'подписчиков у пользователей.')
+
+    def handle(self, *args, **options):
+        """Сверка."""
+        for counter, fixed in counters.reconcile().items():
+            self.stdout.write(f'{counter}: исправлено строк {fixed}')
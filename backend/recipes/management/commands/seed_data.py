@@ -0,0 +1,240 @@
+"""Наполнение базы синтетическими данными для нагрузочных проверок."""
+
+import csv
+import io
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from recipes import counters, shopping
+from recipes.bulk import chunks
+from recipes.catalog import INGREDIENTS, RECIPES, TAGS, bump_version
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, Tag)
+from users.models import SubscrUser, User
+
+DEFAULT_INGREDIENTS_FILE = (
+    settings.BASE_DIR.parent / 'data' / 'ingredients.csv')
+SEED_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+    ('Десерт', 'dessert'),
+    ('Выпечка', 'bakery'),
+    ('Напитки', 'drinks'),
+)
+SEED_IMAGE = 'recipes/images/seed.png'
+SEED_PASSWORD = 'seed-password'
+
+
+def png_pixel():
+    """PNG 1x1, чтобы у рецептов была картинка, из которой строятся копии."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (1, 1), (255, 255, 255)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def zipf_weights(size, exponent=1.1):
+    """Накопленные веса популярности: первые элементы выбираются чаще.
+
+    Накопленные веса считаются один раз, иначе random.choices
+    пересчитывает их на каждый вызов.
+    """
+    return list(accumulate(
+        1 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    """Создает пользователей, рецепты, избранное, корзины и подписки."""
+
+    help = ('Наполняет базу синтетическими пользователями, рецептами, '
+            'избранным, списками покупок и подписками.')
+
+    def add_arguments(self, parser):
+        """Параметры команды."""
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--ingredients-file',
+                            default=DEFAULT_INGREDIENTS_FILE)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Зерно генератора для воспроизводимости.')
+
+    def handle(self, *args, **options):
+        """Генерация данных."""
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        self.rows = 0
+
+        ingredient_ids = self.ensure_ingredients(options['ingredients_file'])
+        tag_ids = self.ensure_tags()
+        self.ensure_image()
+        new_user_ids = self.create_users(options['users'])
+        user_ids = list(User.objects.values_list('id', flat=True))
+        recipe_ids = self.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids)
+        self.create_relations(
+            FavoriteRecipe, new_user_ids, recipe_ids,
+            options['favorites_per_user'])
+        self.create_relations(
+            ShoppingCart, new_user_ids, recipe_ids, options['cart_per_user'])
+        self.rows += shopping.rebuild(user_ids=new_user_ids)
+        self.create_subscriptions(
+            new_user_ids, user_ids, options['subscriptions_per_user'])
+        counters.reconcile()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {self.rows} за {elapsed:.1f} с '
+            f'({self.rows / max(elapsed, 1e-9):.0f} строк/с).'))
+
+    def bulk_create(self, model, objects):
+        """Пакетная вставка с подсчетом строк."""
+        for chunk in chunks(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    chunk, batch_size=self.batch_size, ignore_conflicts=True)
+            self.rows += len(chunk)
+
+    def ensure_ingredients(self, path):
+        """Загружаем ингредиенты из csv, если их еще нет."""
+        if not Ingredient.objects.exists():
+            with open(path, encoding='utf-8') as file:
+                self.bulk_create(Ingredient, (
+                    Ingredient(name=name.strip(),
+                               measurement_unit=unit.strip())
+                    for name, unit in csv.reader(file)
+                ))
+            bump_version(INGREDIENTS)
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def ensure_tags(self):
+        """Создаем набор тегов, если их еще нет."""
+        if not Tag.objects.exists():
+            self.bulk_create(
+                Tag, (Tag(name=name, slug=slug) for name, slug in SEED_TAGS))
+            bump_version(TAGS)
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def ensure_image(self):
+        """Одна общая картинка для всех сгенерированных рецептов."""
+        if not default_storage.exists(SEED_IMAGE):
+            default_storage.save(SEED_IMAGE, ContentFile(png_pixel()))
+
+    def create_users(self, number):
+        """Пользователи с одинаковым заранее захешированным паролем."""
+        last_id = User.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        prefix = f'seed{int(time.time())}'
+        password = make_password(SEED_PASSWORD)
+        self.bulk_create(User, (
+            User(
+                username=f'{prefix}_{index}',
+                email=f'{prefix}_{index}@example.com',
+                first_name=f'Имя{index}',
+                last_name=f'Фамилия{index}',
+                password=password,
+            ) for index in range(number)
+        ))
+        return list(User.objects.filter(id__gt=last_id).values_list(
+            'id', flat=True))
+
+    def create_recipes(self, number, user_ids, tag_ids, ingredient_ids):
+        """Рецепты пачками вместе с тегами и ингредиентами."""
+        rnd = self.random
+        last_id = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        now = timezone.now()
+        author_weights = zipf_weights(len(user_ids), exponent=0.8)
+        ingredient_weights = zipf_weights(len(ingredient_ids))
+        TagThrough = Recipe.tags.through
+        for chunk in chunks(range(number), self.batch_size):
+            authors = rnd.choices(
+                user_ids, cum_weights=author_weights, k=len(chunk))
+            with transaction.atomic():
+                Recipe.objects.bulk_create([
+                    Recipe(
+                        name=f'Рецепт {index}',
+                        text='Синтетический рецепт для нагрузочных тестов.',
+                        cooking_time=rnd.randint(5, 180),
+                        author_id=author_id,
+                        image=SEED_IMAGE,
+                        created_at=now - timedelta(
+                            minutes=rnd.randint(0, 365 * 24 * 60)),
+                    ) for index, author_id in zip(chunk, authors)
+                ], batch_size=self.batch_size)
+                new_ids = list(Recipe.objects.filter(
+                    id__gt=last_id).values_list('id', flat=True))
+                last_id = max(new_ids)
+                tags = []
+                amounts = []
+                for recipe_id in new_ids:
+                    for tag_id in rnd.sample(
+                            tag_ids, min(len(tag_ids), rnd.randint(1, 3))):
+                        tags.append(
+                            TagThrough(recipe_id=recipe_id, tag_id=tag_id))
+                    picked = set(rnd.choices(
+                        ingredient_ids, cum_weights=ingredient_weights,
+                        k=rnd.randint(3, 12)))
+                    amounts.extend(
+                        IngredientRecipe(
+                            recipe_id=recipe_id, ingredient_id=ingredient_id,
+                            amount=rnd.randint(1, 500))
+                        for ingredient_id in picked)
+                TagThrough.objects.bulk_create(
+                    tags, batch_size=self.batch_size)
+                IngredientRecipe.objects.bulk_create(
+                    amounts, batch_size=self.batch_size)
+            self.rows += len(new_ids) + len(tags) + len(amounts)
+        bump_version(RECIPES)
+        return list(Recipe.objects.values_list('id', flat=True))
+
+    def create_relations(self, model, user_ids, recipe_ids, per_user):
+        """Избранное или корзина: популярные рецепты выбираются чаще."""
+        if not recipe_ids or not per_user:
+            return
+        rnd = self.random
+        weights = zipf_weights(len(recipe_ids), exponent=0.7)
+        per_user = min(per_user, len(recipe_ids))
+
+        def generate():
+            for user_id in user_ids:
+                picked = set(rnd.choices(
+                    recipe_ids, cum_weights=weights, k=per_user))
+                for recipe_id in picked:
+                    yield model(user_id=user_id, recipe_id=recipe_id)
+
+        self.bulk_create(model, generate())
+
+    def create_subscriptions(self, subscriber_ids, author_ids, per_user):
+        """Граф подписок: на популярных авторов подписываются чаще."""
+        if len(author_ids) < 2 or not per_user:
+            return
+        rnd = self.random
+        weights = zipf_weights(len(author_ids), exponent=0.9)
+        per_user = min(per_user, len(author_ids) - 1)
+
+        def generate():
+            for subscriber_id in subscriber_ids:
+                picked = set(rnd.choices(
+                    author_ids, cum_weights=weights, k=per_user))
+                picked.discard(subscriber_id)
+                for author_id in picked:
+                    yield SubscrUser(
+                        subscriber_id=subscriber_id, author_id=author_id)
+
+        self.bulk_create(SubscrUser, generate())
@@ -2,14 +2,18 @@
 
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 
+from . import fulltext
 from .constants import (LENGTH_INGREDIENT_MEAS_UNIT,
                         LENGTH_INGREDIENT_NAME, LENGTH_RECIPE_NAME,
                         LENGTH_TAGS_NAME, LENGTH_TAGS_SLUG,
                         MAX_LIMIT_COOK_TIME, MIN_LIMIT_COOK_TIME,
                         MAX_LIMIT_AMOUNT, MIN_LIMIT_AMOUNT)
+from .storage import content_storage
+from users.models import SubscrUser
 
 User = get_user_model()
 
@@ -65,6 +69,67 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Запросы к рецептам."""
+
+    def with_user_flags(self, user):
+        """Отметки избранного и списка покупок для пользователя."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(FavoriteRecipe.objects.filter(
+                recipe=models.OuterRef('pk'), user=user)),
+            is_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                recipe=models.OuterRef('pk'), user=user)),
+        )
+
+    def latest_for_authors(self, author_ids, limit):
+        """Последние limit рецептов каждого автора одним запросом.
+
+        Рецепты нумеруются оконной функцией ROW_NUMBER в пределах автора
+        в порядке сортировки модели. Django 3.2 не умеет фильтровать по
+        оконным функциям, поэтому нумерованный запрос оборачивается в
+        подзапрос. Загружаются только поля для краткой карточки.
+        """
+        ranked = self.filter(author_id__in=author_ids).annotate(
+            row_number=models.Window(
+                expression=RowNumber(),
+                partition_by=models.F('author_id'),
+                order_by=[
+                    models.F('created_at').desc(), models.F('name').asc(),
+                    models.F('cooking_time').asc(), models.F('id').asc(),
+                ],
+            ),
+        ).order_by().values(
+            'id', 'author_id', 'name', 'image', 'cooking_time', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            'ORDER BY author_id, row_number',
+            (*params, limit),
+        )
+
+    def search(self, query):
+        """Полнотекстовый поиск, сначала самые релевантные."""
+        return fulltext.search(
+            self, query, connections[self.db].vendor,
+        ).order_by('-search_rank', *self.model._meta.ordering)
+
+    def with_author_subscription(self, user):
+        """Отметка подписки пользователя на автора рецепта."""
+        if not user.is_authenticated:
+            return self.annotate(author_is_subscribed=models.Value(
+                False, output_field=models.BooleanField()))
+        return self.annotate(author_is_subscribed=models.Exists(
+            SubscrUser.objects.filter(
+                author=models.OuterRef('author'), subscriber=user)))
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
@@ -113,6 +178,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Картинка блюда',
         upload_to='recipes/images/',
+        storage=content_storage,
         help_text='загрузите изображение вашего блюда'
     )
     created_at = models.DateTimeField(
@@ -120,6 +186,17 @@ class Recipe(models.Model):
         default=timezone.now,
         editable=False
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Количество добавлений в избранное',
+        default=0,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         """Свойства."""
@@ -231,3 +308,40 @@ class ShoppingCart(BaseRecipeRelation):
 
         verbose_name = 'Покупка'
         verbose_name_plural = 'Покупки'
+
+
+class ShoppingListItem(models.Model):
+    """Итоговое количество ингредиента в списке покупок пользователя.
+
+    Сумма по всем рецептам из корзины, поддерживается при изменении
+    корзины и ингредиентов рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField('Общее количество')
+
+    class Meta:
+        """Свойства."""
+
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        constraints = [
+            models.UniqueConstraint(
+                name='Unique_shopping_list_item',
+                fields=('user', 'ingredient')),
+        ]
+
+    def __str__(self):
+        """Отображение модели."""
+        return f'{self.user} - {self.ingredient}({self.total_amount})'
@@ -0,0 +1,86 @@
+"""Поиск ингредиентов по названию в памяти процесса."""
+
+from bisect import bisect_left
+
+from .catalog import INGREDIENTS, get_version
+from .models import Ingredient
+from foodgram.routers import PRIMARY
+
+
+def normalize(text):
+    """Приводим строку к виду для сравнения без учета регистра и ё."""
+    return text.casefold().replace('ё', 'е').strip()
+
+
+class IngredientIndex:
+    """Индекс ингредиентов для автодополнения.
+
+    Хранит ингредиенты, отсортированные по нормализованному названию.
+    Совпадения по началу названия ищутся бинарным поиском, совпадения
+    внутри названия — проходом по списку. В выдаче сначала идут
+    совпадения по началу, затем остальные, ближе к началу — выше.
+    Строится при первом обращении и перестраивается, когда меняется
+    версия справочника ингредиентов.
+    """
+
+    def __init__(self):
+        """Пустой индекс."""
+        self._state = (None, None, None, None)
+
+    def build(self, version=None):
+        """Загружаем ингредиенты из основной базы.
+
+        Реплика может отставать, а собранный индекс живет до смены версии.
+        """
+        rows = sorted(
+            (normalize(name), {
+                'id': pk, 'name': name, 'measurement_unit': unit})
+            for pk, name, unit in Ingredient.objects.using(
+                PRIMARY).values_list('id', 'name', 'measurement_unit')
+        )
+        # Версия, ключи и записи заменяются одним присваиванием,
+        # чтобы параллельный поиск не увидел их от разных сборок.
+        self._state = (
+            version,
+            [key for key, _ in rows],
+            [item for _, item in rows],
+            frozenset(item['id'] for _, item in rows),
+        )
+
+    def current(self):
+        """Актуальное состояние индекса."""
+        version = get_version(INGREDIENTS)
+        if self._state[0] != version or self._state[1] is None:
+            self.build(version)
+        return self._state
+
+    def existing(self, ids):
+        """Какие из ids есть в справочнике."""
+        return self.current()[3].intersection(ids)
+
+    def search(self, query, limit=None):
+        """Ингредиенты, название которых содержит query."""
+        _, keys, items, _ = self.current()
+        query = normalize(query)
+        if not query:
+            return items[:limit]
+
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        result = items[start:end]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+
+        substring = sorted(
+            (position, index)
+            for index, key in enumerate(keys)
+            if (position := key.find(query, 1)) > 0
+            and not start <= index < end
+        )
+        result.extend(items[index] for _, index in substring)
+        return result[:limit]
+
+
+ingredient_index = IngredientIndex()
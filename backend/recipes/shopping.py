@@ -0,0 +1,145 @@
+"""Поддержка сводного списка покупок пользователей."""
+
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import (IngredientRecipe, Recipe, ShoppingCart, ShoppingListItem,
+                     User)
+
+BATCH_SIZE = 5000
+
+
+def recipe_amounts(recipe_id):
+    """Количество каждого ингредиента в рецепте."""
+    return dict(IngredientRecipe.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', 'amount'))
+
+
+def lock_recipe(recipe_id):
+    """Блокируем рецепт до конца транзакции.
+
+    Кто меняет состав рецепта или кладет его в корзину, сначала берет
+    эту блокировку, поэтому корзина не прочитает количества, которые
+    в это же время пересчитываются в списках покупок.
+    """
+    list(Recipe.objects.select_for_update().filter(
+        pk=recipe_id).order_by().values_list('pk', flat=True))
+
+
+def amount_deltas(old, new):
+    """Изменения количества ингредиентов между двумя составами рецепта."""
+    deltas = Counter(new)
+    deltas.subtract(old)
+    return {
+        ingredient_id: delta for ingredient_id, delta in deltas.items()
+        if delta
+    }
+
+
+@transaction.atomic
+def apply_deltas(user_ids, deltas):
+    """Прибавляем изменения к спискам покупок пользователей.
+
+    Строки пользователей блокируются, чтобы параллельные изменения
+    корзины одного пользователя не вставили одну строку дважды. Если
+    итоги разошлись с корзиной, количество не уходит ниже нуля, а
+    опустевшие строки удаляются.
+    """
+    user_ids = list(user_ids)
+    if not user_ids or not deltas:
+        return
+    list(User.objects.select_for_update().filter(
+        pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas)
+    existing = set(items.values_list('user_id', 'ingredient_id'))
+    items.update(total_amount=Greatest(F('total_amount') + Case(
+        *(When(ingredient_id=ingredient_id, then=Value(delta))
+          for ingredient_id, delta in deltas.items()),
+        default=Value(0), output_field=IntegerField(),
+    ), 0))
+    ShoppingListItem.objects.bulk_create([
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id,
+            total_amount=delta)
+        for user_id in user_ids
+        for ingredient_id, delta in deltas.items()
+        if delta > 0 and (user_id, ingredient_id) not in existing
+    ])
+    items.filter(total_amount__lte=0).delete()
+
+
+@transaction.atomic(savepoint=False)
+def recipe_added(user_id, recipe_id):
+    """Рецепт добавлен в корзину."""
+    lock_recipe(recipe_id)
+    apply_deltas([user_id], recipe_amounts(recipe_id))
+
+
+@transaction.atomic(savepoint=False)
+def recipe_removed(user_id, recipe_id):
+    """Рецепт удален из корзины."""
+    lock_recipe(recipe_id)
+    apply_deltas([user_id], {
+        ingredient_id: -amount
+        for ingredient_id, amount in recipe_amounts(recipe_id).items()
+    })
+
+
+@transaction.atomic(savepoint=False)
+def recipe_changed(recipe_id, old_amounts, new_amounts):
+    """Изменился состав рецепта, который может лежать в корзинах.
+
+    Рецепт должен быть заблокирован lock_recipe еще до чтения
+    old_amounts, здесь блокировка только подтверждается.
+    """
+    lock_recipe(recipe_id)
+    deltas = amount_deltas(old_amounts, new_amounts)
+    if deltas:
+        apply_deltas(ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True), deltas)
+
+
+def refresh_recipe(recipe_id, ingredient_ids):
+    """Пересчет ингредиентов рецепта в корзинах, например после админки."""
+    rebuild(
+        user_ids=list(ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True)),
+        ingredient_ids=list(ingredient_ids))
+
+
+@transaction.atomic
+def rebuild(user_ids=None, ingredient_ids=None):
+    """Пересчитываем списки покупок заново по корзинам.
+
+    Без аргументов пересчитываются все списки. Возвращает число строк.
+    """
+    items = ShoppingListItem.objects.all()
+    amounts = IngredientRecipe.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        amounts = amounts.filter(recipe__shoppingcart__user_id__in=user_ids)
+    else:
+        amounts = amounts.filter(recipe__shoppingcart__isnull=False)
+    if ingredient_ids is not None:
+        items = items.filter(ingredient_id__in=ingredient_ids)
+        amounts = amounts.filter(ingredient_id__in=ingredient_ids)
+    items.delete()
+    rows = amounts.values(
+        'recipe__shoppingcart__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount')).values_list(
+        'recipe__shoppingcart__user_id', 'ingredient_id', 'total'
+    ).iterator(chunk_size=BATCH_SIZE)
+    created = 0
+    while batch := list(islice(rows, BATCH_SIZE)):
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id,
+                total_amount=total_amount)
+            for user_id, ingredient_id, total_amount in batch)
+        created += len(batch)
+    return created
@@ -0,0 +1,79 @@
+"""Короткие ссылки на рецепты.
+
+Код — это id рецепта в base36 и подпись HMAC фиксированной длины,
+поэтому подобранные или испорченные коды отбрасываются без обращения к
+базе. Существование рецепта проверяется по битовой карте id в памяти
+процесса, которая перестраивается при смене версии списка рецептов.
+"""
+
+import base64
+import binascii
+
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import (base36_to_int, int_to_base36,
+                               urlsafe_base64_decode)
+
+from .catalog import RECIPES, get_version
+from .models import Recipe
+from foodgram.routers import PRIMARY
+
+SIGNATURE_LENGTH = 8
+SALT = 'recipes.shortlinks'
+
+
+def signature(value):
+    """Подпись base36-представления id."""
+    digest = salted_hmac(SALT, value, algorithm='sha256').digest()
+    return base64.urlsafe_b64encode(digest[:6]).decode()
+
+
+def encode(recipe_id):
+    """Короткий код рецепта."""
+    value = int_to_base36(recipe_id)
+    return value + signature(value)
+
+
+def decode(code):
+    """id рецепта из кода или None, если код неверный.
+
+    Поддерживаются и старые неподписанные коды (base64 от id),
+    которые уже разошлись по сети.
+    """
+    value, sign = code[:-SIGNATURE_LENGTH], code[-SIGNATURE_LENGTH:]
+    if value and constant_time_compare(sign, signature(value)):
+        return base36_to_int(value)
+    try:
+        legacy = urlsafe_base64_decode(code).decode()
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+    return int(legacy) if legacy.isascii() and legacy.isdigit() else None
+
+
+class RecipeIdIndex:
+    """Битовая карта id существующих рецептов."""
+
+    def __init__(self):
+        """Пустой индекс."""
+        self._state = (None, None)
+
+    def build(self, version=None):
+        """Загружаем id рецептов из основной базы, реплика может отставать."""
+        ids = list(Recipe.objects.using(PRIMARY).values_list('id', flat=True))
+        bitmap = bytearray(max(ids, default=0) // 8 + 1)
+        for recipe_id in ids:
+            bitmap[recipe_id >> 3] |= 1 << (recipe_id & 7)
+        self._state = (version, bitmap)
+
+    def __contains__(self, recipe_id):
+        """Есть ли рецепт с таким id."""
+        version = get_version(RECIPES)
+        if self._state[0] != version or self._state[1] is None:
+            self.build(version)
+        bitmap = self._state[1]
+        return (
+            0 < recipe_id < len(bitmap) * 8
+            and bool(bitmap[recipe_id >> 3] & (1 << (recipe_id & 7)))
+        )
+
+
+recipe_ids = RecipeIdIndex()
@@ -0,0 +1,110 @@
+"""Обработчики сигналов приложения рецептов."""
+
+from django.db import connections
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+from import_export.signals import post_import
+
+from . import fulltext, images, shopping
+from .catalog import INGREDIENTS, RECIPES, TAGS, bump_version
+from .counters import change_counter
+from .models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart, Tag,
+                     User)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    """Новая версия справочника ингредиентов."""
+    bump_version(INGREDIENTS)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(sender, **kwargs):
+    """Новая версия справочника тегов."""
+    bump_version(TAGS)
+
+
+@receiver(post_import)
+def catalog_imported(sender, model, **kwargs):
+    """Импорт из админки может сохранять строки без сигналов модели."""
+    if model is Ingredient:
+        bump_version(INGREDIENTS)
+    elif model is Tag:
+        bump_version(TAGS)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Изменение тегов рецепта."""
+    if not action.startswith('post_'):
+        return
+    recipe_ids = pk_set or () if reverse else (instance.pk,)
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_recipe_added(sender, instance, created, **kwargs):
+    """Добавляем ингредиенты рецепта в список покупок."""
+    if created:
+        shopping.recipe_added(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def cart_recipe_removed(sender, instance, **kwargs):
+    """Вычитаем ингредиенты рецепта из списка покупок.
+
+    pre_delete приходит до каскадного удаления ингредиентов рецепта,
+    поэтому их количество еще доступно.
+    """
+    shopping.recipe_removed(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def favorite_added(sender, instance, created, **kwargs):
+    """Увеличиваем счетчик избранного у рецепта."""
+    if created:
+        change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                       'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def favorite_removed(sender, instance, **kwargs):
+    """Уменьшаем счетчик избранного у рецепта."""
+    change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                   'favorites_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    """Увеличиваем счетчик рецептов у автора."""
+    if created:
+        change_counter(User.objects.filter(pk=instance.author_id),
+                       'recipes_count', 1)
+        bump_version(RECIPES)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Уменьшаем счетчик рецептов у автора."""
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'recipes_count', -1)
+    bump_version(RECIPES)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, update_fields=None, **kwargs):
+    """Ставим картинку рецепта в очередь на обработку."""
+    if update_fields is None or 'image' in update_fields:
+        images.schedule(instance.image)
+
+
+@receiver(post_migrate)
+def install_fulltext(sender, using, **kwargs):
+    """Создаем индекс полнотекстового поиска после миграций рецептов."""
+    if sender.name == 'recipes':
+        fulltext.install(connections[using])
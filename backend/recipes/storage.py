@@ -0,0 +1,104 @@
+"""Хранилище медиафайлов с адресацией по содержимому.
+
+Файл называется хешем своего содержимого, поэтому одинаковые загрузки
+попадают в один файл и повторно не записываются, а имя никогда не
+указывает на другое содержимое. Такие файлы можно кешировать навсегда.
+Один файл может принадлежать нескольким объектам, поэтому отдельные
+файлы не удаляются: осиротевшие убирает команда gc_media.
+
+Уменьшенные копии из каталогов variants названы по оригиналу, а не по
+своему содержимому, поэтому сохраняются и удаляются как обычные файлы.
+"""
+
+import hashlib
+import os
+from collections import Counter
+from pathlib import PurePosixPath
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Count
+
+HASH_CHUNK_SIZE = 64 * 1024
+VARIANTS_DIR = 'variants'
+
+
+def content_hash(content):
+    """sha256 содержимого файла."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, где имя файла — хеш содержимого."""
+
+    def save(self, name, content, max_length=None):
+        """Сохраняем файл под именем хеша, если его еще нет."""
+        if name is None:
+            name = content.name
+        path = PurePosixPath(name)
+        if path.parent.name == VARIANTS_DIR:
+            return super().save(name, content, max_length=max_length)
+        digest = content_hash(content)
+        name = str(
+            path.parent / digest[:2] / f'{digest}{path.suffix.lower()}')
+        if self.exists(name):
+            # Свежая отметка времени: gc_media не тронет файл, который
+            # снова понадобился, пока не истечет его --grace.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def delete(self, name):
+        """Файл может использоваться другими объектами, не удаляем.
+
+        Копии принадлежат своему оригиналу и удаляются вместе с ним.
+        """
+        if PurePosixPath(name).parent.name == VARIANTS_DIR:
+            super().delete(name)
+
+    def delete_orphan(self, name):
+        """Удаление файла, на который больше нет ссылок."""
+        super().delete(name)
+
+
+content_storage = ContentAddressedStorage()
+
+
+def references():
+    """Число ссылок на каждый файл хранилища."""
+    from recipes.models import Recipe, User
+
+    counts = Counter()
+    for model, field in ((Recipe, 'image'), (User, 'avatar')):
+        rows = (
+            model.objects.exclude(**{field: ''})
+            .exclude(**{f'{field}__isnull': True})
+            .values_list(field).annotate(refs=Count('pk')).order_by()
+        )
+        counts.update(dict(rows))
+    return counts
+
+
+def is_referenced(name):
+    """Ссылается ли на файл хоть один объект."""
+    from recipes.models import Recipe, User
+
+    return (
+        Recipe.objects.filter(image=name).exists()
+        or User.objects.filter(avatar=name).exists()
+    )
+
+
+def stored_files(directory):
+    """Файлы хранилища в каталоге вместе с временем изменения."""
+    for shard in content_storage.listdir(directory)[0]:
+        if shard == 'variants':
+            continue
+        shard_dir = f'{directory}{shard}/'
+        for name in content_storage.listdir(shard_dir)[1]:
+            path = shard_dir + name
+            yield path, os.path.getmtime(content_storage.path(path))
@@ -1,18 +1,34 @@
 """Views-классы."""
 
-from django.shortcuts import get_object_or_404, redirect
-from django.utils.http import urlsafe_base64_decode
+from django.http import Http404
+from django.shortcuts import redirect
 from django.views import View
 
-from .models import Recipe
+from .shortlinks import decode, recipe_ids
+from foodgram.threadpool import run
 
 
 class ShortLinkRedirectView(View):
     """Для редиректа короткой ссылки рецепта."""
 
     def get(self, request, short_code, *args, **kwargs):
-        """Получение URL и редирект."""
-        recipe_id = urlsafe_base64_decode(short_code).decode('utf-8')
-        recipe = get_object_or_404(Recipe, id=int(recipe_id))
-        recipe_url = request.build_absolute_uri(f"/recipes/{recipe.id}/")
+        """Получение URL и редирект без запросов к базе."""
+        recipe_id = decode(short_code)
+        if recipe_id is None or recipe_id not in recipe_ids:
+            raise Http404('Рецепт не найден.')
+        recipe_url = request.build_absolute_uri(f"/recipes/{recipe_id}/")
         return redirect(recipe_url)
+
+
+async def short_link_redirect(request, short_code):
+    """Редирект короткой ссылки под ASGI.
+
+    Карта id рецептов перестраивается из базы при смене версии, поэтому
+    проверка выполняется в пуле потоков.
+    """
+    recipe_id = decode(short_code)
+    if recipe_id is None or not await run(
+            recipe_ids.__contains__, recipe_id):
+        raise Http404('Рецепт не найден.')
+    recipe_url = request.build_absolute_uri(f"/recipes/{recipe_id}/")
+    return redirect(recipe_url)
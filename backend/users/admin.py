@@ -25,6 +25,8 @@ class AdminUser(UserAdmin):
         'is_superuser',
         'date_joined',
         'avatar',
+        'recipes_count',
+        'subscribers_count',
     )
     list_filter = ('is_staff', 'is_superuser',)
     search_fields = ('username', 'email', 'first_name', 'last_name',)
@@ -34,7 +36,8 @@ class AdminUser(UserAdmin):
         'is_superuser',
     )
     filter_horizontal = ('groups', 'user_permissions')
-    readonly_fields = ('date_joined', 'last_login')
+    readonly_fields = (
+        'date_joined', 'last_login', 'recipes_count', 'subscribers_count')
     date_hierarchy = 'date_joined'
 
 
@@ -9,3 +9,7 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
     verbose_name = 'Пользователи и подписки'
+
+    def ready(self):
+        """Подключаем обработчики сигналов."""
+        from . import signals  # noqa: F401
@@ -1,13 +1,32 @@
 """Работа с моделями в приложении."""
 
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from recipes.storage import content_storage
+
 MAX_LENGTH = 150
 
 
+class UserQuerySet(models.QuerySet):
+    """Запросы к пользователям."""
+
+    def with_subscription(self, user):
+        """Отметка подписки пользователя user на каждого из выбранных."""
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=models.Value(
+                False, output_field=models.BooleanField()))
+        return self.annotate(is_subscribed=models.Exists(
+            SubscrUser.objects.filter(
+                author=models.OuterRef('pk'), subscriber=user)))
+
+
+class ProjectUserManager(UserManager.from_queryset(UserQuerySet)):
+    """Менеджер пользователей с дополнительными запросами."""
+
+
 class User(AbstractUser):
     """Моедль пользователя."""
 
@@ -34,8 +53,21 @@ class User(AbstractUser):
         'Аватар',
         blank=True, null=True,
         upload_to='users/images/',
+        storage=content_storage,
         help_text='загрузите вашу аватарку'
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
+
+    objects = ProjectUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'password', 'first_name', 'last_name']
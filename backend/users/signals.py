@@ -0,0 +1,30 @@
+"""Обработчики сигналов приложения пользователей."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import SubscrUser, User
+from recipes import images
+from recipes.counters import change_counter
+
+
+@receiver(post_save, sender=SubscrUser)
+def subscription_added(sender, instance, created, **kwargs):
+    """Увеличиваем счетчик подписчиков у автора."""
+    if created:
+        change_counter(User.objects.filter(pk=instance.author_id),
+                       'subscribers_count', 1)
+
+
+@receiver(post_delete, sender=SubscrUser)
+def subscription_removed(sender, instance, **kwargs):
+    """Уменьшаем счетчик подписчиков у автора."""
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'subscribers_count', -1)
+
+
+@receiver(post_save, sender=User)
+def avatar_saved(sender, instance, update_fields=None, **kwargs):
+    """Ставим аватар в очередь на обработку."""
+    if update_fields is None or 'avatar' in update_fields:
+        images.schedule(instance.avatar)